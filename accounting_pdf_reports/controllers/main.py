@@ -0,0 +1,35 @@
+from odoo import api, http
+from odoo.http import content_disposition, request
+
+
+class GeneralLedgerController(http.Controller):
+
+    @http.route('/accounting_pdf_reports/general_ledger/<int:wizard_id>/csv', type='http', auth='user')
+    def general_ledger_csv(self, wizard_id, active_model='ir.ui.menu', active_ids=''):
+        """ Stream the general ledger of the wizard as a CSV file: the rows
+        are written to the response as they are fetched, so neither the
+        ledger nor the file is ever held in memory as a whole.
+        """
+        ids = [int(res_id) for res_id in active_ids.split(',') if res_id]
+        wizard = request.env['account.report.general.ledger'].browse(wizard_id).exists()
+        if not wizard:
+            raise request.not_found()
+        wizard = wizard.with_context(active_model=active_model, active_ids=ids)
+        records, data = wizard._get_report_data(wizard._prepare_report_data())
+        registry = request.env.registry
+        uid = request.env.uid
+        context = dict(request.env.context, active_model=data['model'], active_ids=records.ids)
+
+        def generate():
+            # the request cursor is closed once the response is returned
+            with registry.cursor() as cr:
+                env = api.Environment(cr, uid, context)
+                report = env['report.accounting_pdf_reports.report_general_ledger']
+                values = report._get_report_values(records.ids, data=data)
+                for chunk in report._iter_csv(values['Accounts']):
+                    yield chunk.encode('utf-8')
+
+        return request.make_response(generate(), headers=[
+            ('Content-Type', 'text/csv; charset=utf-8'),
+            ('Content-Disposition', content_disposition('general_ledger.csv')),
+        ])
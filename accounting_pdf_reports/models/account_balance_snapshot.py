@@ -0,0 +1,61 @@
+from odoo import api, fields, models
+
+
+class AccountBalanceSnapshot(models.Model):
+    _name = "account.balance.snapshot"
+    _description = "Monthly Account Balance"
+    _order = "date, account_id"
+    _log_access = False
+
+    company_id = fields.Many2one('res.company', string='Company', required=True, readonly=True, index=True)
+    account_id = fields.Many2one('account.account', string='Account', required=True, readonly=True, index=True)
+    journal_id = fields.Many2one('account.journal', string='Journal', required=True, readonly=True)
+    date = fields.Date(string='Month', required=True, readonly=True, index=True)
+    debit = fields.Float(string='Debit', readonly=True)
+    credit = fields.Float(string='Credit', readonly=True)
+
+    _sql_constraints = [
+        ('month_uniq', 'unique(company_id, account_id, journal_id, date)',
+         'There can be only one balance per account, journal and month.'),
+    ]
+
+    def init(self):
+        self.env.cr.execute("SELECT 1 FROM account_balance_snapshot LIMIT 1")
+        if not self.env.cr.fetchone():
+            self._rebuild()
+
+    @api.model
+    def _rebuild(self):
+        """ Recompute the monthly balances of all the posted journal items """
+        self.env['account.move.line'].flush_model(['company_id', 'account_id', 'journal_id', 'date', 'debit', 'credit', 'parent_state'])
+        self.env.cr.execute("DELETE FROM account_balance_snapshot")
+        self.env.cr.execute("""
+            INSERT INTO account_balance_snapshot (company_id, account_id, journal_id, date, debit, credit)
+            SELECT l.company_id, l.account_id, l.journal_id, date_trunc('month', l.date)::date,
+                   COALESCE(SUM(l.debit), 0), COALESCE(SUM(l.credit), 0)
+            FROM account_move_line l
+            WHERE l.parent_state = 'posted'
+            GROUP BY l.company_id, l.account_id, l.journal_id, date_trunc('month', l.date)
+        """)
+        self.invalidate_model()
+
+    @api.model
+    def _apply_lines(self, line_ids, sign=1):
+        """ Add (sign 1) or remove (sign -1) the amounts of the given journal
+        items to the monthly balances they belong to, as they are stored.
+        """
+        if not line_ids:
+            return
+        self.env['account.move.line'].flush_model(['company_id', 'account_id', 'journal_id', 'date', 'debit', 'credit'])
+        self.env.cr.execute("""
+            INSERT INTO account_balance_snapshot (company_id, account_id, journal_id, date, debit, credit)
+            SELECT l.company_id, l.account_id, l.journal_id, date_trunc('month', l.date)::date,
+                   %s * COALESCE(SUM(l.debit), 0), %s * COALESCE(SUM(l.credit), 0)
+            FROM account_move_line l
+            WHERE l.id IN %s
+            GROUP BY l.company_id, l.account_id, l.journal_id, date_trunc('month', l.date)
+            ON CONFLICT (company_id, account_id, journal_id, date) DO UPDATE
+            SET debit = account_balance_snapshot.debit + EXCLUDED.debit,
+                credit = account_balance_snapshot.credit + EXCLUDED.credit
+        """, (sign, sign, tuple(line_ids)))
+        self.invalidate_model()
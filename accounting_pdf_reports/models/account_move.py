@@ -0,0 +1,18 @@
+from odoo import models
+
+
+class AccountMove(models.Model):
+    _inherit = "account.move"
+
+    def write(self, vals):
+        if 'state' not in vals:
+            return super().write(vals)
+        # posting, resetting to draft and cancelling move the journal items
+        # of the moves in or out of the monthly balances
+        snapshots = self.env['account.balance.snapshot']
+        posted = self.filtered(lambda move: move.state == 'posted')
+        snapshots._apply_lines(posted.line_ids.ids, -1)
+        res = super(AccountMove, self.with_context(skip_balance_snapshot=True)).write(vals)
+        posted = self.filtered(lambda move: move.state == 'posted')
+        snapshots._apply_lines(posted.line_ids.ids, 1)
+        return res
@@ -1,10 +1,49 @@
 import ast
 from odoo import api, models, fields
+from odoo.tools import date_utils
+
+# Filters of _query_get which the monthly balances can not honour
+SNAPSHOT_UNSUPPORTED_FILTERS = [
+    'aged_balance', 'reconcile_date', 'account_tag_ids', 'analytic_tag_ids',
+    'analytic_account_ids', 'partner_ids', 'partner_categories',
+]
+# Fields of a journal item which the monthly balances depend on
+SNAPSHOT_FIELDS = {
+    'company_id', 'account_id', 'journal_id', 'date', 'debit', 'credit',
+    'balance', 'amount_currency', 'currency_id', 'move_id',
+}
 
 
 class AccountMoveLine(models.Model):
     _inherit = "account.move.line"
 
+    def _get_snapshot_lines(self):
+        if self.env.context.get('skip_balance_snapshot'):
+            return self.browse()
+        return self.filtered(lambda line: line.parent_state == 'posted')
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        lines = super().create(vals_list)
+        self.env['account.balance.snapshot']._apply_lines(lines._get_snapshot_lines().ids, 1)
+        return lines
+
+    def write(self, vals):
+        if not SNAPSHOT_FIELDS.intersection(vals):
+            return super().write(vals)
+        # the journal items of posted moves leave their monthly balances and
+        # enter them again with their new values
+        snapshots = self.env['account.balance.snapshot']
+        posted = self._get_snapshot_lines()
+        snapshots._apply_lines(posted.ids, -1)
+        res = super().write(vals)
+        snapshots._apply_lines(posted.exists()._get_snapshot_lines().ids, 1)
+        return res
+
+    def unlink(self):
+        self.env['account.balance.snapshot']._apply_lines(self._get_snapshot_lines().ids, -1)
+        return super().unlink()
+
     @api.model
     def _query_get(self, domain=None):
         self.check_access('read')
@@ -75,3 +114,57 @@ class AccountMoveLine(models.Model):
             where_string, where_params = query.where_clause
             tables, where_clause, where_clause_params = from_string, where_string, from_params + where_params
         return tables, where_clause, where_clause_params
+
+    @api.model
+    def _query_get_snapshot(self):
+        """ Same as _query_get, on the monthly balances of the posted journal
+        items kept in account.balance.snapshot. Returns None when the filters
+        of the context can not be applied to monthly balances: entries which
+        are not posted, partial months or filters on analytics or partners.
+        """
+        context = dict(self._context or {})
+        state = context.get('state') or ''
+        if state.lower() != 'posted' or any(context.get(key) for key in SNAPSHOT_UNSUPPORTED_FILTERS):
+            return None
+        date_from = fields.Date.to_date(context.get('date_from'))
+        date_to = fields.Date.to_date(context.get('date_to'))
+        if date_from and date_from.day != 1:
+            return None
+        if date_to and date_to != date_utils.end_of(date_to, 'month'):
+            return None
+        self.check_access('read')
+
+        table = '"account_balance_snapshot"'
+        wheres = []
+        params = []
+        if date_to:
+            wheres.append(table + '."date" <= %s')
+            params.append(date_to)
+        if date_from:
+            if not context.get('strict_range'):
+                wheres.append('(' + table + '."date" >= %s OR ' + table + '."account_id" IN '
+                              '(SELECT id FROM account_account WHERE include_initial_balance))')
+            elif context.get('initial_bal'):
+                wheres.append(table + '."date" < %s')
+            else:
+                wheres.append(table + '."date" >= %s')
+            params.append(date_from)
+
+        if context.get('journal_ids'):
+            wheres.append(table + '."journal_id" IN %s')
+            params.append(tuple(context['journal_ids']))
+
+        if context.get('company_id'):
+            wheres.append(table + '."company_id" = %s')
+            params.append(context['company_id'])
+        elif context.get('allowed_company_ids'):
+            wheres.append(table + '."company_id" IN %s')
+            params.append(tuple(self.env.companies.ids))
+        else:
+            wheres.append(table + '."company_id" = %s')
+            params.append(self.env.company.id)
+
+        if context.get('account_ids'):
+            wheres.append(table + '."account_id" IN %s')
+            params.append(tuple(context['account_ids'].ids))
+        return table, ' AND '.join(wheres), params
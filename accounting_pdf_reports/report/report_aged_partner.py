@@ -53,15 +53,11 @@ class ReportAgedPartnerBalance(models.AbstractModel):
             move_state = ['posted']
         arg_list = (tuple(move_state), tuple(account_type))
 
-        reconciliation_clause = '(l.reconciled IS FALSE)'
-        cr.execute('SELECT debit_move_id, credit_move_id FROM account_partial_reconcile where max_date > %s', (date_from,))
-        reconciled_after_date = []
-        for row in cr.fetchall():
-            reconciled_after_date += [row[0], row[1]]
-        if reconciled_after_date:
-            reconciliation_clause = '(l.reconciled IS FALSE OR l.id IN %s)'
-            arg_list += (tuple(reconciled_after_date),)
-        arg_list += (date_from, tuple(company_ids))
+        # Lines reconciled after the aging date are still open at that date
+        reconciliation_clause = '''(l.reconciled IS FALSE OR EXISTS (
+            SELECT 1 FROM account_partial_reconcile apr
+            WHERE apr.max_date > %s AND (apr.debit_move_id = l.id OR apr.credit_move_id = l.id)))'''
+        arg_list += (date_from, date_from, tuple(company_ids))
         query = '''
             SELECT DISTINCT l.partner_id, UPPER(res_partner.name)
             FROM account_move_line AS l left join res_partner on l.partner_id = res_partner.id, account_account, account_move am
@@ -82,111 +78,101 @@ class ReportAgedPartnerBalance(models.AbstractModel):
         # Build a string like (1,2,3) for easy use in SQL query
         if not partner_ids:
             partner_ids = [partner['partner_id'] for partner in partners if partner['partner_id']]
-        lines = dict((partner['partner_id'] or False, []) for partner in partners)
         if not partner_ids:
             return [], [], {}
 
-        # This dictionary will store the not due amount of all partners
-        undue_amounts = {}
-        query = '''SELECT l.id
-                FROM account_move_line AS l, account_account, account_move am
-                WHERE (l.account_id = account_account.id) AND (l.move_id = am.id)
-                    AND (am.state IN %s)
-                    AND (account_account.account_type IN %s)
-                    AND (COALESCE(l.date_maturity,l.date) >= %s)\
-                    AND ((l.partner_id IN %s) OR (l.partner_id IS NULL))
-                AND (l.date <= %s)
-                AND l.company_id IN %s'''
-        cr.execute(query, (tuple(move_state), tuple(account_type), date_from,
-                           tuple(partner_ids), date_from, tuple(company_ids)))
-        aml_ids = cr.fetchall()
-        aml_ids = aml_ids and [x[0] for x in aml_ids] or []
-        for line in self.env['account.move.line'].browse(aml_ids):
-            partner_id = line.partner_id.id or False
-            if partner_id not in undue_amounts:
-                undue_amounts[partner_id] = 0.0
-            line_amount = line.company_id.currency_id._convert(line.balance,
-                                                               user_currency,
-                                                               company, date)
-            if user_currency.is_zero(line_amount):
-                continue
-            for partial_line in line.matched_debit_ids:
-                if partial_line.max_date <= date_from:
-                    line_currency = partial_line.company_id.currency_id
-                    line_amount += line_currency._convert(partial_line.amount,
-                                                          user_currency,
-                                                          company, date)
-            for partial_line in line.matched_credit_ids:
-                if partial_line.max_date <= date_from:
-                    line_currency = partial_line.company_id.currency_id
-                    line_amount -= line_currency._convert(partial_line.amount,
-                                                          user_currency,
-                                                          company, date)
-            if not self.env.user.company_id.currency_id.is_zero(line_amount):
-                undue_amounts[partner_id] += line_amount
-                lines[partner_id].append({
-                    'line': line,
-                    'amount': line_amount,
-                    'period': 6,
-                })
+        # Rates from the currency of each company to the currency of the user
+        currencies = self.env['res.company'].browse(company_ids).currency_id
+        rates = [currency._get_conversion_rate(currency, user_currency, company, date) for currency in currencies]
 
-        # Use one query per period and store results in history (a list variable)
-        # Each history will contain: history[1] = {'<partner_id>': <partner_debit-credit>}
-        history = []
+        # Aging period of each line on its due date: 6 for the not due amounts,
+        # then from 4 (most recent) down to 0 (oldest)
+        period_clause = 'CASE WHEN COALESCE(l.date_maturity, l.date) >= %(date_from)s THEN 6'
+        period_params = {}
         for i in range(5):
-            args_list = (tuple(move_state), tuple(account_type), tuple(partner_ids),)
-            dates_query = '(COALESCE(l.date_maturity,l.date)'
-
-            if periods[str(i)]['start'] and periods[str(i)]['stop']:
-                dates_query += ' BETWEEN %s AND %s)'
-                args_list += (periods[str(i)]['start'], periods[str(i)]['stop'])
-            elif periods[str(i)]['start']:
-                dates_query += ' >= %s)'
-                args_list += (periods[str(i)]['start'],)
+            start, stop = periods[str(i)]['start'], periods[str(i)]['stop']
+            period_params.update({'start_%s' % i: start, 'stop_%s' % i: stop})
+            if start:
+                period_clause += ' WHEN COALESCE(l.date_maturity, l.date) BETWEEN %%(start_%s)s AND %%(stop_%s)s THEN %s' % (i, i, i)
             else:
-                dates_query += ' <= %s)'
-                args_list += (periods[str(i)]['stop'],)
-            args_list += (date_from, tuple(company_ids))
+                period_clause += ' WHEN COALESCE(l.date_maturity, l.date) <= %%(stop_%s)s THEN %s' % (i, i)
+        period_clause += ' END'
 
-            query = '''SELECT l.id
-                    FROM account_move_line AS l, account_account, account_move am
-                    WHERE (l.account_id = account_account.id) AND (l.move_id = am.id)
-                        AND (am.state IN %s)
-                        AND (account_account.account_type IN %s)
-                        AND ((l.partner_id IN %s) OR (l.partner_id IS NULL))
-                        AND ''' + dates_query + '''
-                    AND (l.date <= %s)
-                    AND l.company_id IN %s'''
-            cr.execute(query, args_list)
-            partners_amount = {}
-            aml_ids = cr.fetchall()
-            aml_ids = aml_ids and [x[0] for x in aml_ids] or []
-            for line in self.env['account.move.line'].browse(aml_ids):
-                partner_id = line.partner_id.id or False
-                if partner_id not in partners_amount:
-                    partners_amount[partner_id] = 0.0
-                line_currency_id = line.company_id.currency_id
-                line_amount = line_currency_id._convert(line.balance, user_currency, company, date)
-                if user_currency.is_zero(line_amount):
-                    continue
-                for partial_line in line.matched_debit_ids:
-                    if partial_line.max_date <= date_from:
-                        line_currency_id = partial_line.company_id.currency_id
-                        line_amount += line_currency_id._convert(
-                            partial_line.amount, user_currency, company, date)
-                for partial_line in line.matched_credit_ids:
-                    if partial_line.max_date <= date_from:
-                        line_currency_id = partial_line.company_id.currency_id
-                        line_amount -= line_currency_id._convert(
-                            partial_line.amount, user_currency, company, date)
-                if not self.env.user.company_id.currency_id.is_zero(line_amount):
-                    partners_amount[partner_id] += line_amount
-                    lines[partner_id].append({
-                        'line': line,
-                        'amount': line_amount,
-                        'period': i + 1,
-                        })
-            history.append(partners_amount)
+        # Compute the amount of every line in the currency of the user, less
+        # its partial reconciliations up to the aging date, and sum them by
+        # partner and period in one pass
+        query = '''
+            WITH rate AS (
+                SELECT * FROM unnest(%(currency_ids)s::int[], %(rates)s::numeric[]) AS rate(currency_id, rate)
+            ),
+            aged_line AS (
+                SELECT l.id, l.partner_id, ''' + period_clause + ''' AS period,
+                       ROUND(l.balance * rate.rate, %(digits)s) AS amount
+                FROM account_move_line l
+                JOIN account_account a ON (l.account_id = a.id)
+                JOIN account_move am ON (l.move_id = am.id)
+                JOIN res_company lc ON (l.company_id = lc.id)
+                JOIN rate ON (rate.currency_id = lc.currency_id)
+                WHERE am.state IN %(move_state)s
+                    AND a.account_type IN %(account_type)s
+                    AND (l.partner_id IN %(partner_ids)s OR l.partner_id IS NULL)
+                    AND (l.reconciled IS FALSE OR EXISTS (
+                        SELECT 1 FROM account_partial_reconcile apr
+                        WHERE apr.max_date > %(date_from)s AND (apr.debit_move_id = l.id OR apr.credit_move_id = l.id)))
+                    AND l.date <= %(date_from)s
+                    AND l.company_id IN %(company_ids)s
+            ),
+            partial AS (
+                SELECT apr.credit_move_id AS line_id, ROUND(apr.amount * rate.rate, %(digits)s) AS amount
+                FROM account_partial_reconcile apr
+                JOIN res_company pc ON (apr.company_id = pc.id)
+                JOIN rate ON (rate.currency_id = pc.currency_id)
+                WHERE apr.max_date <= %(date_from)s AND apr.credit_move_id IN (SELECT id FROM aged_line)
+                UNION ALL
+                SELECT apr.debit_move_id AS line_id, -ROUND(apr.amount * rate.rate, %(digits)s) AS amount
+                FROM account_partial_reconcile apr
+                JOIN res_company pc ON (apr.company_id = pc.id)
+                JOIN rate ON (rate.currency_id = pc.currency_id)
+                WHERE apr.max_date <= %(date_from)s AND apr.debit_move_id IN (SELECT id FROM aged_line)
+            ),
+            line_amount AS (
+                SELECT al.partner_id, al.period, al.amount + COALESCE(SUM(p.amount), 0) AS amount
+                FROM aged_line al
+                LEFT JOIN partial p ON (p.line_id = al.id)
+                WHERE ABS(al.amount) >= %(half_rounding)s
+                GROUP BY al.id, al.partner_id, al.period, al.amount
+            )
+            SELECT partner_id, period, SUM(amount) AS amount, COUNT(*) AS line_count
+            FROM line_amount
+            WHERE ABS(amount) >= %(half_rounding)s AND period IS NOT NULL
+            GROUP BY partner_id, period'''
+        params = dict(period_params, **{
+            'currency_ids': currencies.ids,
+            'rates': rates,
+            'digits': user_currency.decimal_places,
+            'half_rounding': user_currency.rounding / 2,
+            'move_state': tuple(move_state),
+            'account_type': tuple(account_type),
+            'partner_ids': tuple(partner_ids),
+            'date_from': date_from,
+            'company_ids': tuple(company_ids),
+        })
+        cr.execute(query, params)
+
+        # undue_amounts stores the not due amount of all partners, history the
+        # amount of each period: history[1] = {'<partner_id>': <partner_debit-credit>}
+        # and lines the number of aged lines of each partner
+        undue_amounts = {}
+        history = [{} for i in range(5)]
+        lines = {}
+        for partner_id, period, amount, line_count in cr.fetchall():
+            partner_id = partner_id or False
+            if period == 6:
+                undue_amounts[partner_id] = amount
+            else:
+                history[period][partner_id] = amount
+            lines[partner_id] = lines.get(partner_id, 0) + line_count
+        browsed_partners = self.env['res.partner'].browse([partner['partner_id'] for partner in partners if partner['partner_id']])
 
         for partner in partners:
             if partner['partner_id'] is None:
@@ -217,7 +203,7 @@ class ReportAgedPartnerBalance(models.AbstractModel):
             total[(i + 1)] += values['total']
             values['partner_id'] = partner['partner_id']
             if partner['partner_id']:
-                browsed_partner = self.env['res.partner'].browse(partner['partner_id'])
+                browsed_partner = browsed_partners.browse(partner['partner_id']).with_prefetch(browsed_partners.ids)
                 values['name'] = browsed_partner.name and len(
                     browsed_partner.name) >= 45 and browsed_partner.name[
                                                     0:40] + '...' or browsed_partner.name
@@ -226,7 +212,7 @@ class ReportAgedPartnerBalance(models.AbstractModel):
                 values['name'] = _('Unknown Partner')
                 values['trust'] = False
 
-            if at_least_one_amount or (self._context.get('include_nullified_amount') and lines[partner['partner_id']]):
+            if at_least_one_amount or (self._context.get('include_nullified_amount') and lines.get(partner['partner_id'])):
                 res.append(values)
 
         return res, total, lines
@@ -7,76 +7,133 @@ class ReportFinancial(models.AbstractModel):
     _name = 'report.accounting_pdf_reports.report_financial'
     _description = 'Financial Reports'
 
-    def _compute_account_balance(self, accounts):
-        """ compute the balance, debit and credit for the provided accounts
+    def _get_query_get(self, context, snapshot=True):
+        """ Return the tables, where clause and parameters of the journal
+        items to aggregate in ``context``, reading the monthly balances when
+        the filters allow it.
+        """
+        MoveLine = self.env['account.move.line'].with_context(context)
+        tables, where_clause, where_params = snapshot and MoveLine._query_get_snapshot() or MoveLine._query_get()
+        tables = tables.replace('"', '') if tables else "account_move_line"
+        return tables, where_clause.strip() or 'TRUE', list(where_params)
+
+    def _compute_account_balance(self, accounts, comparison_context=None):
+        """ compute the balance, debit and credit for the provided accounts,
+        and the balance of the comparison period ('comp_bal') in the same
+        query when a comparison context is given
         """
         mapping = {
             'balance': "COALESCE(SUM(debit),0) - COALESCE(SUM(credit), 0) as balance",
             'debit': "COALESCE(SUM(debit), 0) as debit",
             'credit': "COALESCE(SUM(credit), 0) as credit",
         }
+        if comparison_context is not None:
+            mapping['comp_bal'] = "0.0 as comp_bal"
 
         res = {}
         for account in accounts:
             res[account.id] = dict.fromkeys(mapping, 0.0)
-        if accounts:
-            tables, where_clause, where_params = self.env['account.move.line']._query_get()
-            tables = tables.replace('"', '') if tables else "account_move_line"
-            wheres = [""]
-            if where_clause.strip():
-                wheres.append(where_clause.strip())
-            filters = " AND ".join(wheres)
+        if not accounts:
+            return res
+        tables, where_clause, where_params = self._get_query_get(self.env.context)
+        if comparison_context is None:
             request = "SELECT account_id as id, " + ', '.join(mapping.values()) + \
                        " FROM " + tables + \
-                       " WHERE account_id IN %s " \
-                            + filters + \
+                       " WHERE account_id IN %s AND " + where_clause + \
                        " GROUP BY account_id"
-            params = (tuple(accounts._ids),) + tuple(where_params)
-            self.env.cr.execute(request, params)
-            for row in self.env.cr.dictfetchall():
-                res[row['id']] = row
+            params = [tuple(accounts._ids)] + where_params
+        else:
+            cmp_tables, cmp_where_clause, cmp_where_params = self._get_query_get(comparison_context)
+            if cmp_tables != tables:
+                # the periods can not be read from the same table
+                tables, where_clause, where_params = self._get_query_get(self.env.context, snapshot=False)
+                cmp_tables, cmp_where_clause, cmp_where_params = self._get_query_get(comparison_context, snapshot=False)
+            # both periods are aggregated at once, each on its own filters
+            period = "(" + where_clause + ")"
+            cmp_period = "(" + cmp_where_clause + ")"
+            request = "SELECT account_id as id, " \
+                      "COALESCE(SUM(CASE WHEN " + period + " THEN debit END), 0) - COALESCE(SUM(CASE WHEN " + period + " THEN credit END), 0) as balance, " \
+                      "COALESCE(SUM(CASE WHEN " + period + " THEN debit END), 0) as debit, " \
+                      "COALESCE(SUM(CASE WHEN " + period + " THEN credit END), 0) as credit, " \
+                      "COALESCE(SUM(CASE WHEN " + cmp_period + " THEN debit - credit END), 0) as comp_bal" + \
+                      " FROM " + tables + \
+                      " WHERE account_id IN %s AND (" + period + " OR " + cmp_period + ")" + \
+                      " GROUP BY account_id"
+            params = where_params * 4 + cmp_where_params + [tuple(accounts._ids)] + where_params + cmp_where_params
+        self.env.cr.execute(request, params)
+        for row in self.env.cr.dictfetchall():
+            res[row.pop('id')] = row
         return res
 
-    def _compute_report_balance(self, reports):
+    def _get_report_accounts(self, reports):
+        """ Return the accounts of every 'accounts' and 'account_type' record
+        reachable from ``reports``, searching the accounts of all the account
+        types at once.
+        """
+        nodes = self.env['account.financial.report']
+        todo = reports
+        while todo:
+            nodes |= todo
+            todo = (todo.filtered(lambda r: r.type == 'sum').children_ids
+                    | todo.filtered(lambda r: r.type == 'account_report').account_report_id) - nodes
+        type_nodes = nodes.filtered(lambda r: r.type == 'account_type')
+        accounts_by_type = {}
+        if type_nodes:
+            accounts_by_type = self.env['account.account'].search(
+                [('account_type', 'in', type_nodes.account_type_ids.mapped('type'))]).grouped('account_type')
+        report_accounts = {}
+        for node in nodes:
+            if node.type == 'accounts':
+                report_accounts[node.id] = node.account_ids
+            elif node.type == 'account_type':
+                accounts = self.env['account.account']
+                for account_type in node.account_type_ids.mapped('type'):
+                    accounts |= accounts_by_type.get(account_type, self.env['account.account'])
+                report_accounts[node.id] = accounts
+        return report_accounts
+
+    def _compute_report_balance(self, reports, comparison_context=None):
         '''returns a dictionary with key=the ID of a record and value=the credit, debit and balance amount
-           computed for this record. If the record is of type :
-               'accounts' : it's the sum of the linked accounts
-               'account_type' : it's the sum of leaf accoutns with such an account_type
-               'account_report' : it's the amount of the related report
-               'sum' : it's the sum of the children of this record (aka a 'view' record)'''
-        res = {}
+           computed for this record, and 'comp_bal' for the comparison period if any. If the record is of type :
+               'accounts' : it's the sum of the linked accounts
+               'account_type' : it's the sum of leaf accoutns with such an account_type
+               'account_report' : it's the amount of the related report
+               'sum' : it's the sum of the children of this record (aka a 'view' record)
+           The accounts of the whole tree are read with one query, then each record is computed once.'''
+        report_accounts = self._get_report_accounts(reports)
+        all_accounts = self.env['account.account']
+        for accounts in report_accounts.values():
+            all_accounts |= accounts
+        balances = self._compute_account_balance(all_accounts, comparison_context)
         fields = ['credit', 'debit', 'balance']
-        for report in reports:
+        if comparison_context is not None:
+            fields.append('comp_bal')
+
+        res = {}
+
+        def rollup(report):
             if report.id in res:
-                continue
-            res[report.id] = dict((fn, 0.0) for fn in fields)
-            if report.type == 'accounts':
+                return res[report.id]
+            res[report.id] = vals = dict((fn, 0.0) for fn in fields)
+            if report.type in ('accounts', 'account_type'):
                 # it's the sum of the linked accounts
-                res[report.id]['account'] = self._compute_account_balance(report.account_ids)
-                for value in res[report.id]['account'].values():
-                    for field in fields:
-                        res[report.id][field] += value.get(field)
-            elif report.type == 'account_type':
-                # it's the sum the leaf accounts with such an account type
-                accounts = self.env['account.account'].search(
-                    [('account_type', 'in', report.account_type_ids.mapped('type'))])
-
-                res[report.id]['account'] = self._compute_account_balance(accounts)
-                for value in res[report.id]['account'].values():
-                    for field in fields:
-                        res[report.id][field] += value.get(field)
+                vals['account'] = {account_id: dict(balances[account_id]) for account_id in report_accounts[report.id].ids}
+                children = vals['account'].values()
             elif report.type == 'account_report' and report.account_report_id:
                 # it's the amount of the linked report
-                res2 = self._compute_report_balance(report.account_report_id)
-                for key, value in res2.items():
-                    for field in fields:
-                        res[report.id][field] += value[field]
+                children = [rollup(report.account_report_id)]
             elif report.type == 'sum':
                 # it's the sum of the children of this account.report
-                res2 = self._compute_report_balance(report.children_ids)
-                for key, value in res2.items():
-                    for field in fields:
-                        res[report.id][field] += value[field]
+                children = [rollup(child) for child in report.children_ids]
+            else:
+                children = []
+            for value in children:
+                for field in fields:
+                    vals[field] += value[field]
+            return vals
+
+        for report in reports:
+            rollup(report)
         return res
 
     def get_account_lines(self, data):
@@ -84,17 +141,8 @@ class ReportFinancial(models.AbstractModel):
         account_report = self.env['account.financial.report'].search(
             [('id', '=', data['account_report_id'][0])])
         child_reports = account_report._get_children_by_order()
-        res = self.with_context(data.get('used_context'))._compute_report_balance(child_reports)
-        if data['enable_filter']:
-            comparison_res = self.with_context(
-                data.get('comparison_context'))._compute_report_balance(
-                child_reports)
-            for report_id, value in comparison_res.items():
-                res[report_id]['comp_bal'] = value['balance']
-                report_acc = res[report_id].get('account')
-                if report_acc:
-                    for account_id, val in comparison_res[report_id].get('account').items():
-                        report_acc[account_id]['comp_bal'] = val['balance']
+        comparison_context = data.get('comparison_context') or {} if data['enable_filter'] else None
+        res = self.with_context(data.get('used_context'))._compute_report_balance(child_reports, comparison_context)
         for report in child_reports:
             vals = {
                 'name': report.name,
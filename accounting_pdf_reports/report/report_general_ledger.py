@@ -1,12 +1,88 @@
+import csv
+import io
 import time
 from odoo import api, models, _
 from odoo.exceptions import UserError
 
+# Number of move lines fetched at once from the server-side cursor
+FETCH_SIZE = 2000
+
+CSV_COLUMNS = ['ldate', 'lcode', 'partner_name', 'lref', 'move_name',
+               'lname', 'debit', 'credit', 'balance', 'amount_currency',
+               'currency_code']
+
+
+class MoveLineStream(object):
+    """ Reads the move lines of the general ledger through a server-side
+    cursor and hands them out account by account, in the order of the report,
+    so that only ``fetch_size`` rows are held in memory at a time.
+    """
+
+    def __init__(self, cr, query, params, fetch_size=FETCH_SIZE):
+        self._cr = cr
+        self._done = set()
+        self._rows = self._fetch(query, params, fetch_size)
+        self._next = next(self._rows, None)
+
+    def _fetch(self, query, params, fetch_size):
+        name = 'general_ledger_%s' % id(self)
+        self._cr.execute('DECLARE ' + name + ' NO SCROLL CURSOR FOR ' + query, params)
+        while True:
+            self._cr.execute('FETCH FORWARD %s FROM ' + name, (fetch_size,))
+            rows = self._cr.dictfetchall()
+            if not rows:
+                break
+            yield from rows
+        self._cr.execute('CLOSE ' + name)
+
+    def peek(self, account_id):
+        """ Return the first move line of ``account_id`` without consuming it,
+        skipping what is left of the accounts read before.
+        """
+        self._done.add(account_id)
+        while self._next and self._next['account_id'] != account_id and self._next['account_id'] in self._done:
+            self._next = next(self._rows, None)
+        if self._next and self._next['account_id'] == account_id:
+            return self._next
+        return None
+
+    def lines(self, account_id, initial=None):
+        """ Yield the move lines of ``account_id``, preceded by its initial
+        balance line if any, shifting the running balance computed by the
+        database by the initial balance of the account.
+        """
+        offset = 0.0
+        if initial:
+            offset = initial['balance']
+            yield initial
+        while self.peek(account_id):
+            row = self._next
+            row['balance'] += offset
+            yield row
+            self._next = next(self._rows, None)
+
 
 class ReportGeneralLedger(models.AbstractModel):
     _name = 'report.accounting_pdf_reports.report_general_ledger'
     _description = 'General Ledger Report'
 
+    def _get_move_line_filters(self, analytic_account_ids, partner_ids, initial_bal=False):
+        context = dict(self.env.context)
+        if initial_bal:
+            context['date_to'] = False
+            context['initial_bal'] = True
+        if analytic_account_ids:
+            context['analytic_account_ids'] = analytic_account_ids
+        if partner_ids:
+            context['partner_ids'] = partner_ids
+        tables, where_clause, where_params = self.env['account.move.line'].with_context(context)._query_get()
+        wheres = [""]
+        if where_clause.strip():
+            wheres.append(where_clause.strip())
+        filters = " AND ".join(wheres)
+        filters = filters.replace('account_move_line__move_id', 'm').replace('account_move_line', 'l')
+        return filters, tuple(where_params)
+
     def _get_account_move_entry(self, accounts, analytic_account_ids,
                                 partner_ids, init_balance,
                                 sortby, display_account):
@@ -18,122 +94,119 @@ class ReportGeneralLedger(models.AbstractModel):
                 sortby: sorting by date or partner and journal
                 display_account: type of account(receivable, payable and both)
 
-        Returns a dictionary of accounts with following key and value {
+        Returns an iterator over the accounts with following key and value {
                 'code': account code,
                 'name': account name,
                 'debit': sum of total debit amount,
                 'credit': sum of total credit amount,
                 'balance': total balance,
-                'amount_currency': sum of amount_currency,
-                'move_lines': list of move line
+                'move_lines': iterator over the move lines
         }
+
+        The accounts are yielded lazily: the move lines are streamed from a
+        server-side cursor along with their running balance and the totals of
+        their account, computed by window functions in the same query.
         """
         cr = self.env.cr
-        MoveLine = self.env['account.move.line']
-        move_lines = {x: [] for x in accounts.ids}
+        if not accounts:
+            return []
+        initial_lines = {}
 
-        # Prepare initial sql query and Get the initial move lines
+        # Get the initial balance of the accounts
         if init_balance:
-            context = dict(self.env.context)
-            context['date_from'] = self.env.context.get('date_from')
-            context['date_to'] = False
-            context['initial_bal'] = True
-            if analytic_account_ids:
-                context['analytic_account_ids'] = analytic_account_ids
-            if partner_ids:
-                context['partner_ids'] = partner_ids
-            init_tables, init_where_clause, init_where_params = MoveLine.with_context(context)._query_get()
-            init_wheres = [""]
-            if init_where_clause.strip():
-                init_wheres.append(init_where_clause.strip())
-            init_filters = " AND ".join(init_wheres)
-            filters = init_filters.replace('account_move_line__move_id', 'm').replace('account_move_line', 'l')
-            sql = ("""SELECT 0 AS lid, l.account_id AS account_id, '' AS ldate,
-                '' AS lcode, 0.0 AS amount_currency, 
-                '' AS analytic_account_id, '' AS lref, 
-                'Initial Balance' AS lname, COALESCE(SUM(l.debit),0.0) AS debit, 
-                COALESCE(SUM(l.credit),0.0) AS credit, 
-                COALESCE(SUM(l.debit),0) - COALESCE(SUM(l.credit), 0) as balance, 
-                '' AS lpartner_id,\
-                '' AS move_name, '' AS move_id, '' AS currency_code,\
-                NULL AS currency_id,\
-                '' AS invoice_id, '' AS invoice_type, '' AS invoice_number,\
-                '' AS partner_name\
-                FROM account_move_line l\
-                LEFT JOIN account_move m ON (l.move_id=m.id)\
-                LEFT JOIN res_currency c ON (l.currency_id=c.id)\
-                LEFT JOIN res_partner p ON (l.partner_id=p.id)\
-                JOIN account_journal j ON (l.journal_id=j.id)\
+            filters, where_params = self._get_move_line_filters(analytic_account_ids, partner_ids, initial_bal=True)
+            sql = ("""SELECT l.account_id AS account_id,
+                COALESCE(SUM(l.debit),0.0) AS debit,
+                COALESCE(SUM(l.credit),0.0) AS credit
+                FROM account_move_line l
+                LEFT JOIN account_move m ON (l.move_id=m.id)
+                JOIN account_journal j ON (l.journal_id=j.id)
                 WHERE l.account_id IN %s""" + filters + ' GROUP BY l.account_id')
-            params = (tuple(accounts.ids),) + tuple(init_where_params)
-            cr.execute(sql, params)
+            cr.execute(sql, (tuple(accounts.ids),) + where_params)
             for row in cr.dictfetchall():
-                move_lines[row.pop('account_id')].append(row)
+                initial_lines[row['account_id']] = {
+                    'lid': 0, 'ldate': '', 'lcode': '', 'amount_currency': 0.0,
+                    'analytic_account_id': '', 'lref': '', 'lname': 'Initial Balance',
+                    'debit': row['debit'], 'credit': row['credit'],
+                    'balance': row['debit'] - row['credit'],
+                    'lpartner_id': '', 'move_name': '', 'move_id': '',
+                    'currency_code': '', 'currency_id': None, 'invoice_id': '',
+                    'invoice_type': '', 'invoice_number': '', 'partner_name': '',
+                    'account_id': row['account_id'],
+                }
 
-        sql_sort = 'l.date, l.move_id'
+        sql_sort = 'l.date, l.move_id, l.id'
         if sortby == 'sort_journal_partner':
-            sql_sort = 'j.code, p.name, l.move_id'
-
-        # Prepare sql query base on selected parameters from wizard
-        context = dict(self.env.context)
-        if analytic_account_ids:
-            context['analytic_account_ids'] = analytic_account_ids
-        if partner_ids:
-            context['partner_ids'] = partner_ids
-        tables, where_clause, where_params = MoveLine.with_context(context)._query_get()
-        wheres = [""]
-        if where_clause.strip():
-            wheres.append(where_clause.strip())
-        filters = " AND ".join(wheres)
-        filters = filters.replace('account_move_line__move_id', 'm').replace('account_move_line', 'l')
+            sql_sort = 'j.code, p.name, l.move_id, l.id'
 
-        # Get move lines base on sql query and Calculate the total balance of move lines
-        sql = ('''SELECT l.id AS lid, l.account_id AS account_id, 
-            l.date AS ldate, j.code AS lcode, l.currency_id, 
+        # Stream the move lines in the order of the accounts, with their
+        # running balance and the totals of their account
+        filters, where_params = self._get_move_line_filters(analytic_account_ids, partner_ids)
+        sql = ('''SELECT l.id AS lid, l.account_id AS account_id,
+            l.date AS ldate, j.code AS lcode, l.currency_id,
             l.amount_currency, '' AS analytic_account_id,
-            l.ref AS lref, l.name AS lname, COALESCE(l.debit,0) AS debit, 
-            COALESCE(l.credit,0) AS credit, 
-            COALESCE(SUM(l.debit),0) - COALESCE(SUM(l.credit), 0) AS balance,\
-            m.name AS move_name, c.symbol AS currency_code, 
-            p.name AS partner_name\
-            FROM account_move_line l\
-            JOIN account_move m ON (l.move_id=m.id)\
-            LEFT JOIN res_currency c ON (l.currency_id=c.id)\
-            LEFT JOIN res_partner p ON (l.partner_id=p.id)\
-            JOIN account_journal j ON (l.journal_id=j.id)\
-            JOIN account_account acc ON (l.account_id = acc.id) \
-            WHERE l.account_id IN %s ''' + filters + ''' GROUP BY l.id, 
-            l.account_id, l.date, j.code, l.currency_id, l.amount_currency, 
-            l.ref, l.name, m.name, c.symbol, p.name ORDER BY ''' + sql_sort)
-        params = (tuple(accounts.ids),) + tuple(where_params)
-        cr.execute(sql, params)
-
-        for row in cr.dictfetchall():
-            balance = 0
-            for line in move_lines.get(row['account_id']):
-                balance += line['debit'] - line['credit']
-            row['balance'] += balance
-            move_lines[row.pop('account_id')].append(row)
-
-        # Calculate the debit, credit and balance for Accounts
-        account_res = []
+            l.ref AS lref, l.name AS lname, COALESCE(l.debit,0) AS debit,
+            COALESCE(l.credit,0) AS credit,
+            SUM(COALESCE(l.debit,0) - COALESCE(l.credit,0)) OVER (PARTITION BY l.account_id ORDER BY ''' + sql_sort + ''' ROWS UNBOUNDED PRECEDING) AS balance,
+            SUM(COALESCE(l.debit,0)) OVER (PARTITION BY l.account_id) AS account_debit,
+            SUM(COALESCE(l.credit,0)) OVER (PARTITION BY l.account_id) AS account_credit,
+            m.name AS move_name, c.symbol AS currency_code,
+            p.name AS partner_name
+            FROM account_move_line l
+            JOIN account_move m ON (l.move_id=m.id)
+            LEFT JOIN res_currency c ON (l.currency_id=c.id)
+            LEFT JOIN res_partner p ON (l.partner_id=p.id)
+            JOIN account_journal j ON (l.journal_id=j.id)
+            JOIN account_account acc ON (l.account_id = acc.id)
+            WHERE l.account_id IN %s ''' + filters + '''
+            ORDER BY array_position(%s, l.account_id), ''' + sql_sort)
+        stream = MoveLineStream(cr, sql, (tuple(accounts.ids),) + where_params + (accounts.ids,))
+        return self._iter_accounts(accounts, stream, initial_lines, display_account)
+
+    def _iter_accounts(self, accounts, stream, initial_lines, display_account):
+        """ Yield the accounts to print with their debit, credit and balance,
+        read from the first move line of each account in the stream. The
+        move lines of an account must be read before moving to the next one.
+        """
         for account in accounts:
             currency = account.currency_id and account.currency_id or self.env.company.currency_id
             res = dict((fn, 0.0) for fn in ['credit', 'debit', 'balance'])
             res['code'] = account.code
             res['name'] = account.name
-            res['move_lines'] = move_lines[account.id]
-            for line in res.get('move_lines'):
-                res['debit'] += line['debit']
-                res['credit'] += line['credit']
-                res['balance'] = line['balance']
+            initial = initial_lines.get(account.id)
+            first = stream.peek(account.id)
+            if initial:
+                res['debit'] += initial['debit']
+                res['credit'] += initial['credit']
+            if first:
+                res['debit'] += first['account_debit']
+                res['credit'] += first['account_credit']
+            res['balance'] = res['debit'] - res['credit']
+            res['move_lines'] = stream.lines(account.id, initial)
             if display_account == 'all':
-                account_res.append(res)
-            if display_account == 'movement' and res.get('move_lines'):
-                account_res.append(res)
+                yield res
+            if display_account == 'movement' and (initial or first):
+                yield res
             if display_account == 'not_zero' and not currency.is_zero(res['balance']):
-                account_res.append(res)
-        return account_res
+                yield res
+
+    def _iter_csv(self, accounts_res, chunk_size=FETCH_SIZE):
+        """ Yield the general ledger as CSV text, ``chunk_size`` lines at a
+        time, as the move lines are fetched from the database.
+        """
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(['code', 'account'] + CSV_COLUMNS)
+        count = 0
+        for account in accounts_res:
+            for line in account['move_lines']:
+                writer.writerow([account['code'], account['name']] + [line[column] for column in CSV_COLUMNS])
+                count += 1
+                if count % chunk_size == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+        yield buffer.getvalue()
 
     @api.model
     def _get_report_values(self, docids, data=None):
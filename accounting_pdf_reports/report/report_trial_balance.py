@@ -22,7 +22,9 @@ class ReportTrialBalance(models.AbstractModel):
 
         account_result = {}
         # Prepare sql query base on selected parameters from wizard
-        tables, where_clause, where_params = self.env['account.move.line']._query_get()
+        # Read the monthly balances when the filters allow it
+        query_get = self.env['account.move.line']._query_get_snapshot() or self.env['account.move.line']._query_get()
+        tables, where_clause, where_params = query_get
         tables = tables.replace('"','')
         if not tables:
             tables = 'account_move_line'
@@ -1,3 +1,4 @@
+from urllib.parse import urlencode
 from odoo import fields, models, api, _
 from odoo.exceptions import UserError
 
@@ -33,3 +34,20 @@ class AccountReportGeneralLedger(models.TransientModel):
     def _print_report(self, data):
         records, data = self._get_report_data(data)
         return self.env.ref('accounting_pdf_reports.action_report_general_ledger').with_context(landscape=True).report_action(records, data=data)
+
+    def action_export_csv(self):
+        """ Export the general ledger as a CSV file, streamed to the browser
+        by the general ledger controller as the move lines are read.
+        """
+        self.ensure_one()
+        # check the options before leaving the wizard
+        self._get_report_data(self._prepare_report_data())
+        query = urlencode({
+            'active_model': self.env.context.get('active_model', 'ir.ui.menu'),
+            'active_ids': ','.join(str(res_id) for res_id in self.env.context.get('active_ids', [])),
+        })
+        return {
+            'type': 'ir.actions.act_url',
+            'url': '/accounting_pdf_reports/general_ledger/%s/csv?%s' % (self.id, query),
+            'target': 'self',
+        }
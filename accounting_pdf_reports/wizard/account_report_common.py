@@ -41,7 +41,7 @@ class AccountCommonReport(models.TransientModel):
     def _print_report(self, data):
         raise NotImplementedError()
 
-    def check_report(self):
+    def _prepare_report_data(self):
         self.ensure_one()
         data = {}
         data['ids'] = self.env.context.get('active_ids', [])
@@ -49,4 +49,9 @@ class AccountCommonReport(models.TransientModel):
         data['form'] = self.read(['date_from', 'date_to', 'journal_ids', 'target_move', 'company_id'])[0]
         used_context = self._build_contexts(data)
         data['form']['used_context'] = dict(used_context, lang=get_lang(self.env).code)
+        return data
+
+    def check_report(self):
+        self.ensure_one()
+        data = self._prepare_report_data()
         return self.with_context(discard_logo_check=True)._print_report(data)
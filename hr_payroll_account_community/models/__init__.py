@@ -20,6 +20,7 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
+from . import account_move_line
 from . import hr_contract
 from . import hr_payslip
 from . import hr_payslip_line
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from odoo import fields, models
+
+
+class AccountMoveLine(models.Model):
+    """Extends the standard 'account.move.line' model to link the journal
+    items of the payroll to the payslips they summarize."""
+    _inherit = 'account.move.line'
+
+    payslip_ids = fields.Many2many('hr.payslip',
+                                   'account_move_line_hr_payslip_rel',
+                                   'move_line_id', 'payslip_id',
+                                   string='Payslips', readonly=True,
+                                   copy=False,
+                                   help="Payslips whose lines are summed in "
+                                        "this journal item")
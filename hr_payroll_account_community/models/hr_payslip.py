@@ -20,7 +20,7 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import api, fields, models, _
+from odoo import api, Command, fields, models, _
 from odoo.exceptions import UserError
 
 
@@ -45,6 +45,13 @@ class HrPayslip(models.Model):
                               readonly=True, copy=False,
                               help="Accounting entry associated with "
                                    "this record")
+    move_line_ids = fields.Many2many('account.move.line',
+                                     'account_move_line_hr_payslip_rel',
+                                     'payslip_id', 'move_line_id',
+                                     string='Journal Items', readonly=True,
+                                     copy=False,
+                                     help="Journal items of the batch entry "
+                                          "summing the lines of this payslip")
 
     @api.model
     def create(self, vals):
@@ -74,109 +81,215 @@ class HrPayslip(models.Model):
         first uncanceled, then all moves are unlinked. Finally, the method
         calls the parent class's action_payslip_cancel method."""
         moves = self.mapped('move_id')
+        shared = self.search([('move_id', 'in', moves.ids),
+                              ('id', 'not in', self.ids)], limit=1)
+        if shared:
+            raise UserError(
+                _('The accounting entry %s is shared with other payslips of '
+                  'the batch, cancel them together.') % shared.move_id.name)
         moves.filtered(lambda x: x.state == 'posted').button_cancel()
         moves.unlink()
         return super(HrPayslip, self).action_payslip_cancel()
 
     def action_payslip_done(self):
         """Finalize and post the payroll slip, creating accounting entries.This
-         method is called when marking a payroll slip as done. It calculates
-         the accounting entries based on the salary details, creates a move
-         (journal entry),and posts it. If necessary, adjustment entries are
-         added to balance the debit and credit amounts."""
+         method is called when marking a payroll slip as done. The moves of
+         all the payslips are built first, created with a single call and
+         posted together: one move per payslip, or one move per batch for the
+         batches grouping their entries."""
         res = super(HrPayslip, self).action_payslip_done()
+        self._create_account_moves()
+        return res
+
+    def _create_account_moves(self):
+        """Function for creating and posting the accounting entries of the
+        payslips in batch"""
+        rule_accounts = self.mapped(
+            'line_ids.salary_rule_id')._get_move_line_accounts()
+        move_dicts = []
+        move_slips = []
+        groups = {}
         for slip in self:
-            line_ids = []
-            debit_sum = 0.0
-            credit_sum = 0.0
-            name = _('Payslip of %s') % slip.employee_id.name
-            move_dict = {
-                'narration': name,
+            date = slip.date or slip.date_to
+            if slip.payslip_run_id.move_grouping == 'batch':
+                groups.setdefault((slip.payslip_run_id, slip.journal_id,
+                                   slip.company_id, date), []).append(slip)
+                continue
+            line_ids, debit_sum, credit_sum = slip._prepare_move_lines(
+                rule_accounts)
+            move_dicts.append({
+                'narration': _('Payslip of %s') % slip.employee_id.name,
                 'ref': slip.number,
                 'journal_id': slip.journal_id.id,
-                'date': slip.date or slip.date_to,
-            }
-            for line in slip.details_by_salary_rule_category_ids:
-                amount = slip.company_id.currency_id.round(
-                    slip.credit_note and -line.total or line.total)
-                if slip.company_id.currency_id.is_zero(amount):
-                    continue
-                debit_account_id = line.salary_rule_id.account_debit_id.id
-                credit_account_id = line.salary_rule_id.account_credit_id.id
-                if debit_account_id:
-                    debit_line = (0, 0, {
-                        'name': line.name,
-                        'partner_id': line._get_partner_id(
-                            credit_account=False),
-                        'account_id': debit_account_id,
-                        'journal_id': slip.journal_id.id,
-                        'date': slip.date or slip.date_to,
-                        'debit': amount > 0.0 and amount or 0.0,
-                        'credit': amount < 0.0 and -amount or 0.0,
-                        'tax_line_id': line.salary_rule_id.account_tax_id.id,
-                    })
-                    line_ids.append(debit_line)
-                    debit_sum += debit_line[2]['debit'] - debit_line[2][
-                        'credit']
-                if credit_account_id:
-                    credit_line = (0, 0, {
-                        'name': line.name,
-                        'partner_id': line._get_partner_id(credit_account=True),
-                        'account_id': credit_account_id,
-                        'journal_id': slip.journal_id.id,
-                        'date': slip.date or slip.date_to,
-                        'debit': amount < 0.0 and -amount or 0.0,
-                        'credit': amount > 0.0 and amount or 0.0,
-                        'tax_line_id': line.salary_rule_id.account_tax_id.id,
-                    })
-                    line_ids.append(credit_line)
-                    credit_sum += credit_line[2]['credit'] - credit_line[2][
-                        'debit']
-            if slip.company_id.currency_id.compare_amounts(
-                    credit_sum, debit_sum) == -1:
-                acc_id = slip.journal_id.default_account_id.id
-                if not acc_id:
-                    raise UserError(
-                        _('The Expense Journal "%s" has not properly '
-                          'configured the Credit Account!') % (
-                            slip.journal_id.name))
-                adjust_credit = (0, 0, {
-                    'name': _('Adjustment Entry'),
-                    'partner_id': False,
-                    'account_id': acc_id,
-                    'journal_id': slip.journal_id.id,
-                    'date': slip.date or slip.date_to,
-                    'debit': 0.0,
-                    'credit':  slip.company_id.currency_id.round(
-                        debit_sum - credit_sum),
-                })
-                line_ids.append(adjust_credit)
-            elif slip.company_id.currency_id.compare_amounts(
-                    debit_sum, credit_sum) == -1:
-                acc_id = slip.journal_id.default_account_id.id
-                if not acc_id:
-                    raise UserError(
-                        _('The Expense Journal "%s" has not properly '
-                          'configured the Debit Account!') % (
-                            slip.journal_id.name))
-                adjust_debit = (0, 0, {
-                    'name': _('Adjustment Entry'),
-                    'partner_id': False,
-                    'account_id': acc_id,
-                    'journal_id': slip.journal_id.id,
-                    'date': slip.date or slip.date_to,
-                    'debit':  slip.company_id.currency_id.round(
-                        credit_sum - debit_sum),
-                    'credit': 0.0,
-                })
-                line_ids.append(adjust_debit)
-            move_dict['line_ids'] = line_ids
-            move = self.env['account.move'].create(move_dict)
-            slip.write({'move_id': move.id, 'date': slip.date or slip.date_to})
+                'date': date,
+                'line_ids': line_ids + self._prepare_adjustment_lines(
+                    slip.journal_id, slip.company_id.currency_id, date,
+                    debit_sum, credit_sum),
+            })
+            move_slips.append(slip)
+        for (run, journal, company, date), slips in groups.items():
+            line_ids, debit_sum, credit_sum = self.concat(
+                *slips)._prepare_batch_move_lines(rule_accounts, run.name)
+            move_dicts.append({
+                'narration': _('Payslips of %s') % run.name,
+                'ref': run.name,
+                'journal_id': journal.id,
+                'date': date,
+                'line_ids': line_ids + self._prepare_adjustment_lines(
+                    journal, company.currency_id, date, debit_sum,
+                    credit_sum),
+            })
+            move_slips.append(self.concat(*slips))
+        moves = self.env['account.move'].create(move_dicts)
+        for move, slips in zip(moves, move_slips):
             if not move.line_ids:
                 raise UserError(
                     _("As you installed the payroll accounting module you have"
                       " to choose Debit and Credit account for at least one "
                       "salary rule in the chosen Salary Structure."))
-            move.action_post()
-        return res
+            for slip in slips:
+                slip.write({'move_id': move.id,
+                            'date': slip.date or slip.date_to})
+        moves.action_post()
+        return moves
+
+    def _prepare_move_lines(self, rule_accounts):
+        """
+        @param rule_accounts: accounting of the salary rules, as returned by
+        hr.salary.rule._get_move_line_accounts
+        @return: tuple (line_ids, debit_sum, credit_sum) of the commands
+        creating the move lines of the payslip and of their balances on the
+        debit and credit sides
+        """
+        self.ensure_one()
+        currency = self.company_id.currency_id
+        date = self.date or self.date_to
+        line_ids = []
+        debit_sum = 0.0
+        credit_sum = 0.0
+        for line in self.details_by_salary_rule_category_ids:
+            amount = currency.round(
+                self.credit_note and -line.total or line.total)
+            if currency.is_zero(amount):
+                continue
+            accounts = rule_accounts[line.salary_rule_id.id]
+            analytic_account_id = accounts['analytic_account_id'] or \
+                self.contract_id.analytic_account_id.id
+            analytic_distribution = analytic_account_id and {
+                str(analytic_account_id): 100.0}
+            if accounts['debit']:
+                debit_account_id, partner_id = accounts['debit']
+                debit_line = (0, 0, {
+                    'name': line.name,
+                    'partner_id': partner_id,
+                    'account_id': debit_account_id,
+                    'journal_id': self.journal_id.id,
+                    'date': date,
+                    'debit': amount > 0.0 and amount or 0.0,
+                    'credit': amount < 0.0 and -amount or 0.0,
+                    'tax_line_id': accounts['tax_id'],
+                    'analytic_distribution': analytic_distribution,
+                })
+                line_ids.append(debit_line)
+                debit_sum += debit_line[2]['debit'] - debit_line[2][
+                    'credit']
+            if accounts['credit']:
+                credit_account_id, partner_id = accounts['credit']
+                credit_line = (0, 0, {
+                    'name': line.name,
+                    'partner_id': partner_id,
+                    'account_id': credit_account_id,
+                    'journal_id': self.journal_id.id,
+                    'date': date,
+                    'debit': amount < 0.0 and -amount or 0.0,
+                    'credit': amount > 0.0 and amount or 0.0,
+                    'tax_line_id': accounts['tax_id'],
+                    'analytic_distribution': analytic_distribution,
+                })
+                line_ids.append(credit_line)
+                credit_sum += credit_line[2]['credit'] - credit_line[2][
+                    'debit']
+        return line_ids, debit_sum, credit_sum
+
+    def _prepare_batch_move_lines(self, rule_accounts, name):
+        """
+        Sum the move lines of the payslips of a batch by account, partner,
+        analytic account and tax, each summed line being linked to the
+        payslips it comes from.
+        @param rule_accounts: accounting of the salary rules, as returned by
+        hr.salary.rule._get_move_line_accounts
+        @param name: label of the summed lines mixing several rules
+        @return: tuple (line_ids, debit_sum, credit_sum) as returned by
+        _prepare_move_lines for all the payslips
+        """
+        groups = {}
+        debit_sum = credit_sum = 0.0
+        for slip in self:
+            slip_line_ids, slip_debit, slip_credit = \
+                slip._prepare_move_lines(rule_accounts)
+            debit_sum += slip_debit
+            credit_sum += slip_credit
+            for dummy, dummy, vals in slip_line_ids:
+                key = (vals['account_id'], vals['partner_id'],
+                       str(vals['analytic_distribution']),
+                       vals['tax_line_id'])
+                group = groups.get(key)
+                if not group:
+                    group = groups[key] = dict(vals, balance=0.0,
+                                               payslip_ids=set())
+                elif group['name'] != vals['name']:
+                    group['name'] = name
+                group['balance'] += vals['debit'] - vals['credit']
+                group['payslip_ids'].add(slip.id)
+        line_ids = []
+        currency = self.company_id[:1].currency_id
+        for group in groups.values():
+            balance = currency.round(group.pop('balance'))
+            if currency.is_zero(balance):
+                continue
+            group.update(debit=balance > 0.0 and balance or 0.0,
+                         credit=balance < 0.0 and -balance or 0.0,
+                         payslip_ids=[Command.set(sorted(
+                             group['payslip_ids']))])
+            line_ids.append(Command.create(group))
+        return line_ids, debit_sum, credit_sum
+
+    @api.model
+    def _prepare_adjustment_lines(self, journal, currency, date, debit_sum,
+                                  credit_sum):
+        """
+        @return: the commands creating the adjustment line balancing the
+        debit and credit sums of a move on the default account of the
+        journal, if they differ
+        """
+        if currency.compare_amounts(credit_sum, debit_sum) == -1:
+            acc_id = journal.default_account_id.id
+            if not acc_id:
+                raise UserError(
+                    _('The Expense Journal "%s" has not properly '
+                      'configured the Credit Account!') % (journal.name))
+            return [(0, 0, {
+                'name': _('Adjustment Entry'),
+                'partner_id': False,
+                'account_id': acc_id,
+                'journal_id': journal.id,
+                'date': date,
+                'debit': 0.0,
+                'credit': currency.round(debit_sum - credit_sum),
+            })]
+        elif currency.compare_amounts(debit_sum, credit_sum) == -1:
+            acc_id = journal.default_account_id.id
+            if not acc_id:
+                raise UserError(
+                    _('The Expense Journal "%s" has not properly '
+                      'configured the Debit Account!') % (journal.name))
+            return [(0, 0, {
+                'name': _('Adjustment Entry'),
+                'partner_id': False,
+                'account_id': acc_id,
+                'journal_id': journal.id,
+                'date': date,
+                'debit': currency.round(credit_sum - debit_sum),
+                'credit': 0.0,
+            })]
+        return []
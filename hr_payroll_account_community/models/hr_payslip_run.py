@@ -38,3 +38,10 @@ class HrPayslipRun(models.Model):
                                      'account.journal'].search(
                                      [('type', '=', 'general')],
                                      limit=1))
+    move_grouping = fields.Selection(selection=[
+        ('slip', 'One Entry per Payslip'),
+        ('batch', 'One Entry per Batch'),
+    ], string='Accounting Entries', required=True, default='slip',
+        help="Post one accounting entry per payslip, or a single entry "
+             "summing the lines of all the payslips of the batch confirmed "
+             "together by account, partner, analytic account and tax.")
@@ -45,3 +45,23 @@ class HrSalaryRule(models.Model):
                                         help="Credit account associated with"
                                              " the record",
                                         domain=[('deprecated', '=', False)])
+
+    def _get_move_line_accounts(self):
+        """Resolve the accounting of salary rules once for all their lines.
+        @return: dict mapping each rule id to a dict of the 'debit' and
+        'credit' tuples (account_id, partner_id), False when the rule has no
+        such account, and of the 'tax_id' of the rule
+        """
+        res = {}
+        for rule in self:
+            # same partner as hr.payslip.line._get_partner_id
+            partner_id = rule.register_id.partner_id.id
+            res[rule.id] = {
+                'debit': rule.account_debit_id and (
+                    rule.account_debit_id.id, partner_id),
+                'credit': rule.account_credit_id and (
+                    rule.account_credit_id.id, partner_id),
+                'tax_id': rule.account_tax_id.id,
+                'analytic_account_id': rule.analytic_account_id.id,
+            }
+        return res
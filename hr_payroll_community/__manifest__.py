@@ -22,7 +22,7 @@
 #############################################################################
 {
     'name': 'Odoo 18 HR Payroll',
-    'version': '18.0.1.0.0',
+    'version': '18.0.1.1.0',
     'category': 'Human Resources',
     'summary': """Odoo 18 HR Payroll, Odoo18 Payroll, Payroll, Odoo Payroll, Payroll V18, Odoo18, Payroll Management, Odoo18 Payslip""",
     'description': """The system automates payroll management by streamlining
@@ -42,6 +42,7 @@
         'security/ir.model.access.csv',
         'data/ir_sequence_data.xml',
         'data/hr_payroll_community_data.xml',
+        'data/ir_cron_data.xml',
         'wizard/hr_payslips_employees_views.xml',
         'wizard/payslip_lines_contribution_register_views.xml',
         'report/hr_payroll_report.xml',
@@ -52,6 +53,7 @@
         'views/hr_contract_views.xml',
         'views/hr_salary_rule_views.xml',
         'views/hr_salary_rule_category_views.xml',
+        'views/hr_salary_rule_profile_views.xml',
         'views/hr_contribution_register_views.xml',
         'views/hr_payroll_structure_views.xml',
         'views/hr_payslip_views.xml',
@@ -59,6 +61,7 @@
         'views/hr_employee_views.xml',
         'views/hr_payslip_run_views.xml',
         'views/res_config_settings_views.xml',
+        'wizard/hr_payroll_simulation_views.xml',
     ],
     'demo': ['data/hr_payroll_community_demo.xml'],
     'images': ['static/description/banner.png'],
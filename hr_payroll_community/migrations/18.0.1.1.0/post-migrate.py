@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from odoo.tools.sql import column_exists
+
+SOURCE_COLUMNS = ('condition_python', 'condition_range',
+                  'amount_python_compute', 'amount_percentage_base')
+
+
+def migrate(cr, version):
+    """Function for moving the rule sources copied on the payslip lines to
+    the rule versions, then dropping the columns left by the lines"""
+    if not all(column_exists(cr, 'hr_payslip_line', column)
+               for column in SOURCE_COLUMNS):
+        return
+    columns = ', '.join(SOURCE_COLUMNS)
+    cr.execute(f"""
+        INSERT INTO hr_salary_rule_version
+               (rule_id, {columns}, create_uid, create_date, write_uid,
+                write_date)
+        SELECT DISTINCT salary_rule_id, {columns}, 1,
+               now() AT TIME ZONE 'UTC', 1, now() AT TIME ZONE 'UTC'
+          FROM hr_payslip_line
+         WHERE salary_rule_id IS NOT NULL
+    """)
+    matches = ' AND '.join(
+        f'version.{column} IS NOT DISTINCT FROM line.{column}'
+        for column in SOURCE_COLUMNS)
+    cr.execute(f"""
+        UPDATE hr_payslip_line line
+           SET rule_version_id = version.id
+          FROM hr_salary_rule_version version
+         WHERE version.rule_id = line.salary_rule_id
+           AND {matches}
+    """)
+    for column in SOURCE_COLUMNS:
+        cr.execute(f'ALTER TABLE hr_payslip_line DROP COLUMN {column}')
@@ -25,6 +25,7 @@ from . import hr_contract_advantage_template
 from . import hr_contribution_register
 from . import hr_employee
 from . import hr_leave_type
+from . import hr_payroll_job
 from . import hr_payroll_structure
 from . import hr_payslip
 from . import hr_payslip_input
@@ -34,5 +35,7 @@ from . import hr_payslip_run
 from . import hr_payslip_worked_days
 from . import hr_rule_input
 from . import hr_salary_rule_category
+from . import hr_salary_rule_profile
+from . import hr_salary_rule_version
 from . import res_config_settings
 from . import resource_mixin
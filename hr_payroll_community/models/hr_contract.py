@@ -21,6 +21,7 @@
 #
 #############################################################################
 from odoo import fields, models
+from odoo.tools.sql import create_index
 
 
 class HrContract(models.Model):
@@ -56,6 +57,13 @@ class HrContract(models.Model):
     other_allowance = fields.Monetary(string="Other Allowance",
                                       help="Other allowances")
 
+    def init(self):
+        """Index the contracts by employee, state and dates for the
+        searches of the contracts of the payslips"""
+        create_index(self.env.cr, 'hr_contract_employee_state_dates_index',
+                     self._table,
+                     ['employee_id', 'state', 'date_start', 'date_end'])
+
     def get_all_structures(self):
         """
         @return: the structures linked to the given contracts, ordered by
@@ -0,0 +1,137 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import logging
+import threading
+
+from odoo import api, fields, models
+
+_logger = logging.getLogger(__name__)
+
+# Crons running the payroll jobs, each one in its own worker
+PAYROLL_JOB_CRONS = ['hr_payroll_community.ir_cron_payroll_job_%s' % index
+                     for index in range(1, 5)]
+
+# Methods a payroll job may call, by model of the record running it
+PAYROLL_JOB_METHODS = {
+    'hr.payslip.run': '_run_generation_job',
+    'hr.payroll.simulation': '_run_simulation_job',
+}
+
+
+class HrPayrollJob(models.Model):
+    """Create new model for the chunks of payroll work run in the background
+    by the payroll crons, each chunk in its own transaction"""
+    _name = 'hr.payroll.job'
+    _description = 'Payroll Background Job'
+    _order = 'id'
+
+    res_model = fields.Char(string='Model', required=True, readonly=True,
+                            help="Model of the record running the job")
+    res_id = fields.Many2oneReference(string='Record', required=True,
+                                      readonly=True, model_field='res_model',
+                                      help="Record running the job")
+    method = fields.Char(string='Method', required=True, readonly=True,
+                         help="Method of the record called with the job")
+    employee_ids = fields.Many2many('hr.employee',
+                                    'hr_payroll_job_employee_rel',
+                                    'job_id', 'employee_id',
+                                    string='Employees', readonly=True,
+                                    help="Employees processed by the job")
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='pending', required=True, readonly=True,
+        index=True, help="Status of the job")
+    error = fields.Text(string='Error', readonly=True,
+                        help="Error raised by the job")
+    result = fields.Json(string='Result', readonly=True,
+                         help="Values returned by the job")
+
+    @api.model
+    def _trigger_workers(self, count):
+        """Function for waking up to count crons to run the pending jobs"""
+        for xml_id in PAYROLL_JOB_CRONS[:max(count, 1)]:
+            cron = self.env.ref(xml_id, raise_if_not_found=False)
+            if cron:
+                cron._trigger()
+
+    @api.model
+    def _cron_run(self):
+        """Function run by the payroll crons: claims the pending jobs one at
+        a time, the jobs claimed by the other crons being skipped, and
+        commits each of them, except in the tests"""
+        auto_commit = not getattr(threading.current_thread(), 'testing',
+                                  False)
+        while True:
+            self.env.cr.execute("""
+                SELECT id FROM hr_payroll_job WHERE state = 'pending'
+                ORDER BY id LIMIT 1 FOR UPDATE SKIP LOCKED""")
+            row = self.env.cr.fetchone()
+            if not row:
+                break
+            job = self.browse(row[0])
+            job._run()
+            job.flush_recordset()
+            if auto_commit:
+                self.env.cr.commit()
+
+    def _run(self):
+        """Function for running the job as the user who queued it, rolling
+        back its work when it fails. Only the methods of
+        PAYROLL_JOB_METHODS are run, the result they return being kept on
+        the job"""
+        self.ensure_one()
+        if PAYROLL_JOB_METHODS.get(self.res_model) != self.method:
+            self.write({
+                'state': 'failed',
+                'error': "Method %s of %s cannot be run by a payroll job" % (
+                    self.method, self.res_model),
+            })
+            return
+        job = self.with_user(self.create_uid)
+        record = job.env[self.res_model].browse(self.res_id).exists()
+        if not record:
+            self.write({
+                'state': 'failed',
+                'error': "Record %s of %s running the job was deleted" % (
+                    self.res_id, self.res_model),
+            })
+            return
+        try:
+            with self.env.cr.savepoint():
+                result = getattr(record, self.method)(job)
+            self.write({'state': 'done', 'result': result})
+        except Exception as e:
+            _logger.exception("Payroll job %s failed", self.id)
+            self.write({'state': 'failed', 'error': str(e)})
+
+    def action_retry(self):
+        """Function for queuing the failed jobs again. The jobs are only
+        written by the payroll crons and this function, the users having a
+        read-only access"""
+        self.filtered(lambda job: job.state == 'failed').sudo().write({
+            'state': 'pending',
+            'error': False,
+        })
+        self._trigger_workers(len(PAYROLL_JOB_CRONS))
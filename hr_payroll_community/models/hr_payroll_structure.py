@@ -20,7 +20,7 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import ValidationError
 
 
@@ -62,6 +62,12 @@ class HrPayrollStructure(models.Model):
                                 'struct_id',
                                 'rule_id', string='Salary Rules',
                                 help="Choose Salary Rule")
+    rule_profile_ids = fields.One2many('hr.salary.rule.profile',
+                                       compute='_compute_rule_profile_ids',
+                                       string='Rule Profiles',
+                                       help="Cost of the evaluations of the "
+                                            "rules of the structure, by "
+                                            "payslip batch")
 
     @api.constrains('parent_id')
     def _check_parent_id(self):
@@ -70,6 +76,18 @@ class HrPayrollStructure(models.Model):
             raise ValidationError(
                 _('You cannot create a recursive salary structure.'))
 
+    def write(self, vals):
+        """Drop the rule plans when the rules of a structure change"""
+        if any(field in vals for field in
+               ('rule_ids', 'parent_id', 'children_ids')):
+            self.env.registry.clear_cache()
+        return super(HrPayrollStructure, self).write(vals)
+
+    def unlink(self):
+        """Drop the rule plans of the deleted structures"""
+        self.env.registry.clear_cache()
+        return super(HrPayrollStructure, self).unlink()
+
     @api.returns('self', lambda value: value.id)
     def copy(self, default=None):
         """Function for return Payroll Structure"""
@@ -77,6 +95,14 @@ class HrPayrollStructure(models.Model):
         default = dict(default or {}, code=_("%s (copy)") % (self.code))
         return super(HrPayrollStructure, self).copy(default)
 
+    def _compute_rule_profile_ids(self):
+        """Function for getting the profiles of the rules of the structure"""
+        for struct in self:
+            struct.rule_profile_ids = self.env[
+                'hr.salary.rule.profile'].search(
+                [('rule_id', 'in', [rule_id for rule_id, sequence in
+                                    struct.get_all_rules()])])
+
     def get_all_rules(self):
         """
         @return: returns a list of tuple (id, sequence) of rules that are maybe
@@ -93,3 +119,37 @@ class HrPayrollStructure(models.Model):
         if parent:
             parent = parent._get_parent_structure()
         return parent + self
+
+    @api.model
+    @tools.ormcache('structure_ids')
+    def _get_rule_plan(self, structure_ids):
+        """
+        Flatten the rule tree of structures once per worker.
+        @param structure_ids: sorted tuple of the ids of the structures,
+        parents included
+        @return: tuple (rule_ids, skipped_ids, category_ancestors) where
+        rule_ids are the ids of the rules of the structures and of their
+        children in computation order, skipped_ids maps each rule id to the
+        frozenset of the ids of the rule and of all its children, skipped
+        together when the rule does not apply, and category_ancestors is the
+        ancestor table of the categories of the rules
+        """
+        rule_ids = self.browse(structure_ids).get_all_rules()
+        sorted_rule_ids = tuple(id for id, sequence in
+                                sorted(rule_ids, key=lambda x: x[1]))
+        skipped_ids = {}
+
+        def _get_skipped_ids(rule):
+            """Function for getting the ids of a rule and its children"""
+            if rule.id not in skipped_ids:
+                skipped_ids[rule.id] = frozenset([rule.id]).union(
+                    *(_get_skipped_ids(child) for child in rule.child_ids))
+            return skipped_ids[rule.id]
+
+        rules = self.env['hr.salary.rule'].browse(set(sorted_rule_ids))
+        for rule in rules:
+            _get_skipped_ids(rule)
+        category_ancestors = self.env[
+            'hr.salary.rule.category']._get_ancestor_table(
+            tuple(sorted(rules.category_id.ids)))
+        return sorted_rule_ids, skipped_ids, category_ancestors
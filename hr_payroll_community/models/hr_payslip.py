@@ -20,16 +20,121 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
+import logging
+from contextlib import nullcontext
 from datetime import date, datetime, time
 from dateutil.relativedelta import relativedelta
+from psycopg2 import OperationalError
 from odoo import api, fields, models, tools, _
+from odoo.tools import float_compare
+from odoo.addons.hr_payroll_community.models.hr_salary_rule_category import \
+    CategoryAccumulator
+from odoo.addons.hr_payroll_community.models.hr_salary_rule_profile import \
+    RuleProfiler
 from odoo.exceptions import UserError, ValidationError
-from pytz import timezone
+from odoo.service.model import PG_CONCURRENCY_ERRORS_TO_RETRY
 import babel
 
+_logger = logging.getLogger(__name__)
+
 # This will generate 16th of days
 ROUNDING_FACTOR = 16
 
+# Grouped queries loading the history of the done payslips: for each
+# employee, code and period, the totals summed by the sum() helpers of the
+# salary rules
+HISTORY_QUERIES = {
+    'line': """
+        SELECT hp.employee_id, pl.code, hp.date_from, hp.date_to,
+        sum(case when hp.credit_note = False then (pl.total)
+        else (-pl.total) end)
+        FROM hr_payslip as hp, hr_payslip_line as pl
+        WHERE hp.employee_id in %s AND hp.state = 'done'
+        AND hp.date_from >= %s AND hp.id = pl.slip_id
+        GROUP BY hp.employee_id, pl.code, hp.date_from, hp.date_to""",
+    'input': """
+        SELECT hp.employee_id, pi.code, hp.date_from, hp.date_to,
+        sum(amount)
+        FROM hr_payslip as hp, hr_payslip_input as pi
+        WHERE hp.employee_id in %s AND hp.state = 'done'
+        AND hp.date_from >= %s AND hp.id = pi.payslip_id
+        GROUP BY hp.employee_id, pi.code, hp.date_from, hp.date_to""",
+    'worked_days': """
+        SELECT hp.employee_id, pi.code, hp.date_from, hp.date_to,
+        sum(number_of_days), sum(number_of_hours)
+        FROM hr_payslip as hp, hr_payslip_worked_days as pi
+        WHERE hp.employee_id in %s AND hp.state = 'done'
+        AND hp.date_from >= %s AND hp.id = pi.payslip_id
+        GROUP BY hp.employee_id, pi.code, hp.date_from, hp.date_to""",
+}
+
+
+# Names making a rule read values outside of the payslip snapshot: the
+# payslip itself and the history of the done payslips
+RULE_VOLATILE_NAMES = frozenset(['payslip', 'sum', 'sum_hours'])
+
+# Number of tries of the recording of the rule profiles, which the workers
+# computing the chunks of a batch may record at the same time
+PROFILE_RECORD_TRIES = 5
+
+
+class PayslipHistory(object):
+    """History of the done payslips of the employees of a batch since a
+    given date. Each kind of line is loaded with one grouped query the first
+    time a rule needs it, then the sums asked by the rules are answered in
+    memory. Ranges starting before that date are not covered."""
+
+    def __init__(self, env, employee_ids, date_start):
+        """Function for getting env, employee_ids and date_start"""
+        self.env = env
+        self.employee_ids = frozenset(employee_ids)
+        self.date_start = date_start
+        self._rows = {}
+        self._sums = {}
+
+    def covers(self, employee_id, from_date):
+        """Function for checking the history holds the given range"""
+        return employee_id in self.employee_ids and \
+            fields.Date.to_date(from_date) >= self.date_start
+
+    def _get_rows(self, kind):
+        """Function for loading the history of a kind of line"""
+        if kind not in self._rows:
+            rows = {}
+            self.env.cr.execute(HISTORY_QUERIES[kind],
+                                (tuple(self.employee_ids), self.date_start))
+            for employee_id, code, date_from, date_to, *values in \
+                    self.env.cr.fetchall():
+                rows.setdefault((employee_id, code), []).append(
+                    (date_from, date_to, values))
+            self._rows[kind] = rows
+        return self._rows[kind]
+
+    def sum(self, kind, employee_id, code, from_date, to_date):
+        """
+        @return: the sums of the payslips of the employee starting from
+        from_date and ending before to_date, as a tuple filled with None
+        when no payslip matches, like the SQL sum would be
+        """
+        from_date = fields.Date.to_date(from_date)
+        to_date = fields.Date.to_date(to_date)
+        key = (kind, employee_id, code, from_date, to_date)
+        if key not in self._sums:
+            values = [values for date_from, date_to, values in
+                      self._get_rows(kind).get((employee_id, code), [])
+                      if date_from >= from_date and date_to <= to_date]
+            self._sums[key] = tuple(
+                self._sum_column(column) for column in zip(*values)
+            ) if values else (None, None)
+        return self._sums[key]
+
+    @staticmethod
+    def _sum_column(column):
+        """Function for summing a column ignoring the NULL values, None
+        when they all are, like the SQL sum"""
+        values = [value for value in column if value is not None]
+        return sum(values) if values else None
+
 
 class HrPayslip(models.Model):
     """Create new model for getting total Payroll Sheet for an Employee"""
@@ -111,6 +216,11 @@ class HrPayslip(models.Model):
     payslip_count = fields.Integer(compute='_compute_payslip_count',
                                    string="Payslip Computation Details",
                                    help="Set Payslip Count")
+    compute_snapshot = fields.Json(string='Computation Snapshot',
+                                   readonly=True, copy=False,
+                                   help="State of the payslip at its last "
+                                        "computation, used to update the "
+                                        "sheet incrementally")
 
     def _compute_details_by_salary_rule_category_ids(self):
         """Compute function for Salary Rule Category for getting
@@ -189,6 +299,24 @@ class HrPayslip(models.Model):
         @return: returns the ids of all the contracts for the given employee
         that need to be considered for the given dates
         """
+        batch = self.env.context.get('payslip_contract_ids')
+        if batch and employee.id in batch['values'] and \
+                batch['date_from'] == date_from and \
+                batch['date_to'] == date_to:
+            return batch['values'][employee.id]
+        return self._get_contracts_batch(employee.ids, date_from,
+                                         date_to).get(employee.id, [])
+
+    @api.model
+    def _get_contracts_batch(self, employee_ids, date_from, date_to):
+        """
+        @param employee_ids: ids of the employees
+        @param date_from: date_field
+        @param date_to: date_field
+        @return: dict mapping each employee id to the ids of its contracts
+        to consider for the given dates, searched at once for all the
+        employees
+        """
         # a contract is valid if it ends between the given dates
         clause_1 = ['&', ('date_end', '<=', date_to),
                     ('date_end', '>=', date_from)]
@@ -199,29 +327,246 @@ class HrPayslip(models.Model):
         # date_end (or never finish)
         clause_3 = ['&', ('date_start', '<=', date_from), '|',
                     ('date_end', '=', False), ('date_end', '>=', date_to)]
-        clause_final = [('employee_id', '=', employee.id),
+        clause_final = [('employee_id', 'in', employee_ids),
                         ('state', '=', 'open'), '|',
                         '|'] + clause_1 + clause_2 + clause_3
-        return self.env['hr.contract'].search(clause_final).ids
+        res = {employee_id: [] for employee_id in employee_ids}
+        for contract in self.env['hr.contract'].search_fetch(
+                clause_final, ['employee_id']):
+            res[contract.employee_id.id].append(contract.id)
+        return res
 
     def action_compute_sheet(self):
-        """Function for compute Payslip sheet"""
+        """Function for compute Payslip sheet. The payslips are computed as
+        a batch: the rule plan of each structure is resolved once and the
+        lines of all the payslips are created with a single call"""
+        # delete old payslip lines
+        self.mapped('line_ids').unlink()
+        # load the contracts, worked days and inputs of the whole batch
+        self.mapped('contract_id')
+        self.mapped('worked_days_line_ids')
+        self.mapped('input_line_ids')
+        # history of the previous payslips, for year-to-date rules
+        history = self and PayslipHistory(
+            self.env, self.employee_id.ids,
+            min(self.mapped('date_from')) + relativedelta(years=-1, month=1,
+                                                          day=1))
+        # contracts of the payslips without one, searched once per period
+        period_contracts = {
+            period: self._get_contracts_batch(payslips.employee_id.ids,
+                                              *period)
+            for period, payslips in self.filtered(
+                lambda payslip: not payslip.contract_id).grouped(
+                lambda payslip: (payslip.date_from, payslip.date_to)).items()}
+        # profiles of the rules, by batch, for the batches profiling them
+        profilers = {}
+        lines = []
         for payslip in self:
-            number = payslip.number or self.env['ir.sequence'].next_by_code(
-                'salary.slip')
-            # delete old payslip lines
-            payslip.line_ids.unlink()
+            if not payslip.number:
+                payslip.number = self.env['ir.sequence'].next_by_code(
+                    'salary.slip')
             # set the list of contract for which the rules have to be applied
             # if we don't give the contract, then the rules to apply should be
             # for all current contracts of the employee
-            contract_ids = payslip.contract_id.ids or \
-                           self.get_contract(payslip.employee_id,
-                                             payslip.date_from, payslip.date_to)
-            lines = [(0, 0, line) for line in
-                     self._get_payslip_lines(contract_ids, payslip.id)]
-            payslip.write({'line_ids': lines, 'number': number})
+            contract_ids = payslip.contract_id.ids or period_contracts[
+                payslip.date_from, payslip.date_to][payslip.employee_id.id]
+            structure_ids = payslip._get_structure_ids(
+                self.env['hr.contract'].browse(contract_ids))
+            profiler = None
+            if payslip.payslip_run_id.profile_rules or \
+                    self.env.context.get('payroll_profile'):
+                profiler = profilers.setdefault(
+                    payslip.payslip_run_id.id, RuleProfiler(self.env.cr))
+            try:
+                payslip_lines = self._get_payslip_lines(
+                    contract_ids, payslip.id, structure_ids=structure_ids,
+                    history=history, profiler=profiler)
+            except Exception:
+                self._record_rule_profiles(profilers, failed=True)
+                raise
+            for line in payslip_lines:
+                line['slip_id'] = payslip.id
+                lines.append(line)
+            payslip.compute_snapshot = payslip._get_compute_snapshot(
+                contract_ids, structure_ids)
+        self.env['hr.payslip.line'].create(lines)
+        self._record_rule_profiles(profilers)
         return True
 
+    @api.model
+    def _record_rule_profiles(self, profilers, failed=False):
+        """
+        @param profilers: dict mapping a batch id to the RuleProfiler of its
+        payslips
+        @param failed: whether the computation failed, the profiles being
+        then recorded even when the current transaction is rolled back.
+        The profiles are recorded once the current transaction is over, in a
+        new one, so that recording them neither waits on the rows locked by
+        the computation nor fails it when the workers of a batch record the
+        same profiles at the same time.
+        """
+        if not profilers:
+            return
+        if failed:
+            for profiler in profilers.values():
+                for rule_id, stats in profiler.stats.items():
+                    if stats['error_count']:
+                        _logger.warning("Salary rule %s failed: %s", rule_id,
+                                        stats['last_error'])
+        registry, uid = self.env.registry, self.env.uid
+        recorded = []
+
+        def record():
+            if recorded:
+                return
+            recorded.append(True)
+            for attempt in range(PROFILE_RECORD_TRIES):
+                try:
+                    with registry.cursor() as cr:
+                        env = api.Environment(cr, uid, {})
+                        for run_id, profiler in profilers.items():
+                            env['hr.salary.rule.profile']._record(run_id,
+                                                                  profiler)
+                    return
+                except Exception as e:
+                    if isinstance(e, OperationalError) and \
+                            e.pgcode in PG_CONCURRENCY_ERRORS_TO_RETRY and \
+                            attempt < PROFILE_RECORD_TRIES - 1:
+                        continue
+                    _logger.warning("Could not record the profiles of the "
+                                    "salary rules", exc_info=True)
+                    return
+
+        self.env.cr.postcommit.add(record)
+        if failed:
+            self.env.cr.postrollback.add(record)
+
+    def action_compute_sheet_incremental(self):
+        """Function for updating Payslip sheet. Only the rules depending on
+        the inputs and worked days changed since the last computation are
+        evaluated again, and the lines are updated in place. The payslips
+        which cannot be updated are computed again from scratch."""
+        full = self.browse([payslip.id for payslip in self
+                            if not payslip._compute_sheet_incremental()])
+        if full:
+            full.action_compute_sheet()
+        return True
+
+    def _get_compute_snapshot(self, contract_ids, structure_ids):
+        """
+        @param contract_ids: ids of the contracts computed in the payslip
+        @param structure_ids: sorted tuple of the ids of the structures
+        applied
+        @return: dict of what the rules of the payslip read, stored on the
+        payslip to detect what changed before an incremental update
+        """
+        self.ensure_one()
+        contracts = self.env['hr.contract'].browse(contract_ids)
+        rules = self.env['hr.salary.rule'].browse(self.env[
+            'hr.payroll.structure']._get_rule_plan(structure_ids)[0])
+        return {
+            'contract_ids': list(contract_ids),
+            'structure_ids': list(structure_ids),
+            'rule_ids': rules.ids,
+            'rules_date': str(max(rules.mapped('write_date'), default='')),
+            'contracts_date': str(max(contracts.mapped('write_date'),
+                                      default='')),
+            'employee_date': str(self.employee_id.write_date),
+            'date_from': str(self.date_from),
+            'date_to': str(self.date_to),
+            'credit_note': self.credit_note,
+            'inputs': {line.code: line.amount
+                       for line in self.input_line_ids},
+            'worked_days': {line.code: [line.number_of_days,
+                                        line.number_of_hours]
+                            for line in self.worked_days_line_ids},
+        }
+
+    def _compute_sheet_incremental(self):
+        """
+        Update the lines of a computed draft payslip, evaluating again only
+        the rules reading a changed input, worked day, category or rule.
+        @return: False when the payslip has to be computed from scratch:
+        its contracts, employee, dates or rules changed since the last
+        computation, or its rules cannot be tracked
+        """
+        self.ensure_one()
+        snapshot = self.compute_snapshot
+        if self.state != 'draft' or not snapshot or not self.line_ids:
+            return False
+        contract_ids = self.contract_id.ids or self.get_contract(
+            self.employee_id, self.date_from, self.date_to)
+        if len(contract_ids) != 1:
+            return False
+        structure_ids = self._get_structure_ids(
+            self.env['hr.contract'].browse(contract_ids))
+        current = self._get_compute_snapshot(contract_ids, structure_ids)
+        if any(current[key] != snapshot.get(key) for key in current
+               if key not in ('inputs', 'worked_days')):
+            return False
+        rules = self.env['hr.salary.rule'].browse(self.env[
+            'hr.payroll.structure']._get_rule_plan(structure_ids)[0])
+        names = {rule.id: rule._get_expression_names(rule.id,
+                                                     rule.write_date)
+                 for rule in rules}
+        if len(set(rules.mapped('code'))) != len(rules) or \
+                not all(isolated for dummy, isolated in names.values()):
+            return False
+        lines = {line.code + '-' + str(line.contract_id.id): line
+                 for line in self.line_ids}
+        if len(lines) != len(self.line_ids):
+            return False
+        previous = {
+            'lines': lines,
+            'names': {rule_id: rule_names
+                      for rule_id, (rule_names, dummy) in names.items()},
+            'changed_inputs': {
+                code for code in set(snapshot['inputs']) | set(
+                    current['inputs'])
+                if snapshot['inputs'].get(code) != current[
+                    'inputs'].get(code)},
+            'changed_worked_days': {
+                code for code in set(snapshot['worked_days']) | set(
+                    current['worked_days'])
+                if snapshot['worked_days'].get(code) != current[
+                    'worked_days'].get(code)},
+        }
+        results = self._get_payslip_lines(contract_ids, self.id,
+                                          structure_ids=structure_ids,
+                                          previous=previous)
+        Line = self.env['hr.payslip.line']
+        new_lines = []
+        for values in results:
+            line = lines.pop(values['code'] + '-' + str(
+                values['contract_id']), None)
+            if not line:
+                new_lines.append(dict(values, slip_id=self.id))
+                continue
+            changes = {}
+            for name, value in values.items():
+                field = line._fields[name]
+                if field.convert_to_record(field.convert_to_cache(
+                        value, line), line) != line[name]:
+                    changes[name] = value
+            if changes:
+                line.write(changes)
+        Line.create(new_lines)
+        Line.union(*lines.values()).unlink()
+        self.compute_snapshot = current
+        return True
+
+    def _get_structure_ids(self, contracts):
+        """
+        @param contracts: recordset of the contracts computed in the payslip
+        @return: tuple of the ids of the structures to apply, parent
+        structures included
+        """
+        self.ensure_one()
+        if len(contracts) == 1 and self.struct_id:
+            return tuple(sorted(
+                set(self.struct_id._get_parent_structure().ids)))
+        return tuple(sorted(contracts.get_all_structures()))
+
     @api.model
     def get_worked_day_lines(self, contracts, date_from, date_to):
         """
@@ -229,27 +574,36 @@ class HrPayslip(models.Model):
         @return: returns a list of dict containing the input that should be
         applied for the given contract between date_from and date_to
         """
+        batch = self.env.context.get('payslip_worked_days')
+        if batch and set(contracts.ids) <= batch['values'].keys() and \
+                batch['date_from'] == date_from and \
+                batch['date_to'] == date_to:
+            return [dict(line) for contract in contracts
+                    for line in batch['values'][contract.id]]
         res = []
+        day_from = datetime.combine(fields.Date.from_string(date_from),
+                                    time.min)
+        day_to = datetime.combine(fields.Date.from_string(date_to), time.max)
         # fill only if the contract as a working schedule linked
-        for contract in contracts.filtered(
-                lambda contract: contract.resource_calendar_id):
-            day_from = datetime.combine(fields.Date.from_string(date_from),
-                                        time.min)
-            day_to = datetime.combine(fields.Date.from_string(date_to),
-                                      time.max)
+        contracts = contracts.filtered(
+            lambda contract: contract.resource_calendar_id)
+        # compute the attendances and leaves of all the employees sharing
+        # a working schedule at once
+        work_data = {}
+        calendar_hours = {}
+        for calendar, calendar_contracts in contracts.grouped(
+                'resource_calendar_id').items():
+            work_data[calendar.id], calendar_hours[calendar.id] = \
+                calendar_contracts.employee_id._get_payroll_work_data_batch(
+                    day_from, day_to, calendar)
+        for contract in contracts:
+            calendar = contract.resource_calendar_id
+            work_days = work_data[calendar.id][contract.employee_id.id]
             # compute leave days
             leaves = {}
-            calendar = contract.resource_calendar_id
-            tz = timezone(calendar.tz)
-            day_leave_intervals = contract.employee_id.list_leaves(
-                day_from, day_to, calendar=contract.resource_calendar_id)
             multi_leaves = []
-            for day, hours, leave in day_leave_intervals:
-                work_hours = calendar.get_work_hours_count(
-                    tz.localize(datetime.combine(day, time.min)),
-                    tz.localize(datetime.combine(day, time.max)),
-                    compute_leaves=False,
-                )
+            for day, hours, leave in work_days['leaves']:
+                work_hours = calendar_hours[calendar.id][day]
                 if len(leave) > 1:
                     for each in leave:
                         if each.holiday_id:
@@ -270,15 +624,12 @@ class HrPayslip(models.Model):
                     if work_hours:
                         current_leave_struct[
                             'number_of_days'] += hours / work_hours
-            # compute worked days
-            work_data = contract.employee_id.get_work_days_data(
-                day_from, day_to, calendar=contract.resource_calendar_id)
             attendances = {
                 'name': _("Normal Working Days paid at 100%"),
                 'sequence': 1,
                 'code': 'WORK100',
-                'number_of_days': work_data['days'],
-                'number_of_hours': work_data['hours'],
+                'number_of_days': work_days['days'],
+                'number_of_hours': work_days['hours'],
                 'contract_id': contract.id,
             }
             res.append(attendances)
@@ -311,14 +662,15 @@ class HrPayslip(models.Model):
         return res
 
     @api.model
-    def get_inputs(self, contracts, date_from, date_to):
-        """Function for getting contracts upon date_from and date_to fields"""
+    def get_inputs(self, contracts, date_from, date_to, structure_ids=None):
+        """Function for getting the inputs of the rules of the structures of
+        the contracts, or of the given structure_ids, upon date_from and
+        date_to fields"""
         res = []
-        structure_ids = contracts.get_all_structures()
-        rule_ids = self.env['hr.payroll.structure'].browse(
-            structure_ids).get_all_rules()
-        sorted_rule_ids = [id for id, sequence in
-                           sorted(rule_ids, key=lambda x: x[1])]
+        if structure_ids is None:
+            structure_ids = tuple(sorted(contracts.get_all_structures()))
+        sorted_rule_ids = self.env['hr.payroll.structure']._get_rule_plan(
+            structure_ids)[0]
         inputs = self.env['hr.salary.rule'].browse(sorted_rule_ids).mapped(
             'input_ids')
         for contract in contracts:
@@ -331,23 +683,51 @@ class HrPayslip(models.Model):
                     'date_to': date_to,
                 }
                 res.append(input_data)
+        employee = contracts[:1].employee_id or self.employee_id
+        input_values = self._get_input_values(employee.id, date_from, date_to)
+        for input_data in res:
+            input_data.update(input_values.get(input_data['code'], {}))
         return res
 
     @api.model
-    def _get_payslip_lines(self, contract_ids, payslip_id):
-        """Function for getting Payslip Lines"""
-
-        def _sum_salary_rule_category(localdict, category, amount):
-            """Function for getting total sum of Salary Rule Category"""
-            if category.parent_id:
-                localdict = _sum_salary_rule_category(localdict,
-                                                      category.parent_id,
-                                                      amount)
-            localdict['categories'].dict[category.code] \
-                = category.code in localdict[
-                'categories'].dict and localdict['categories'].dict[
-                      category.code] + amount or amount
-            return localdict
+    def _get_input_values(self, employee_id, date_from, date_to):
+        """
+        @return: dict of the values of the inputs of an employee by code,
+        taken from the 'payslip_input_values' of the context when it was
+        resolved for the whole batch of the employee
+        """
+        batch = self.env.context.get('payslip_input_values')
+        if batch and employee_id in batch['employee_ids'] and \
+                batch['date_from'] == date_from and \
+                batch['date_to'] == date_to:
+            return batch['values'].get(employee_id, {})
+        return self._get_batch_input_values(
+            [employee_id], date_from, date_to).get(employee_id, {})
+
+    @api.model
+    def _get_batch_input_values(self, employee_ids, date_from, date_to):
+        """Hook resolving the inputs of the payslips of a batch at once,
+        extended by the modules feeding inputs from their own records.
+        @return: dict mapping an employee id to the dict of the values of
+        its inputs by code
+        """
+        return {}
+
+    @api.model
+    def _get_payslip_lines(self, contract_ids, payslip_id,
+                           structure_ids=None, history=None, previous=None,
+                           profiler=None):
+        """Function for getting Payslip Lines
+        @param structure_ids: sorted tuple of the ids of the structures to
+        apply, resolved from the payslip and its contracts when not given
+        @param history: PayslipHistory of the batch answering the sum()
+        helpers, which query the database when not given
+        @param previous: for an incremental update, dict of the current
+        'lines' of the payslip by key, the 'names' read by each rule and
+        the codes of the 'changed_inputs' and 'changed_worked_days': the
+        rules reading none of the changed names keep their previous result
+        @param profiler: RuleProfiler measuring the evaluations of the rules
+        """
 
         class BrowsableObject(object):
             """Class for Browsable Object"""
@@ -371,6 +751,9 @@ class HrPayslip(models.Model):
                  from_date,to_date fields"""
                 if to_date is None:
                     to_date = fields.Date.today()
+                if history and history.covers(self.employee_id, from_date):
+                    return history.sum('input', self.employee_id, code,
+                                       from_date, to_date)[0] or 0.0
                 self.env.cr.execute("""
                     SELECT sum(amount) as sum
                     FROM hr_payslip as hp, hr_payslip_input as pi
@@ -390,6 +773,9 @@ class HrPayslip(models.Model):
                  from_date,to_date fields"""
                 if to_date is None:
                     to_date = fields.Date.today()
+                if history and history.covers(self.employee_id, from_date):
+                    return history.sum('worked_days', self.employee_id, code,
+                                       from_date, to_date)
                 self.env.cr.execute("""
                     SELECT sum(number_of_days) as number_of_days, 
                     sum(number_of_hours) as number_of_hours
@@ -422,6 +808,9 @@ class HrPayslip(models.Model):
                  from_date,to_date fields"""
                 if to_date is None:
                     to_date = fields.Date.today()
+                if history and history.covers(self.employee_id, from_date):
+                    return history.sum('line', self.employee_id, code,
+                                       from_date, to_date)[0] or 0.0
                 self.env.cr.execute("""SELECT sum(case when hp.credit_note = 
                 False then (pl.total) else (-pl.total) end)
                 FROM hr_payslip as hp, hr_payslip_line as pl
@@ -440,7 +829,7 @@ class HrPayslip(models.Model):
         rules_dict = {}
         worked_days_dict = {}
         inputs_dict = {}
-        blacklist = []
+        blacklist = set()
         payslip = self.env['hr.payslip'].browse(payslip_id)
         for worked_days_line in payslip.worked_days_line_ids:
             worked_days_dict[worked_days_line.code] = worked_days_line
@@ -455,21 +844,27 @@ class HrPayslip(models.Model):
         baselocaldict = {'categories': categories, 'rules': rules,
                          'payslip': payslips, 'worked_days': worked_days,
                          'inputs': inputs}
-        # get the ids of the structures on the contracts and their
-        # parent id as well
         contracts = self.env['hr.contract'].browse(contract_ids)
-        if len(contracts) == 1 and payslip.struct_id:
-            structure_ids = list(
-                set(payslip.struct_id._get_parent_structure().ids))
-        else:
-            structure_ids = contracts.get_all_structures()
-        # get the rules of the structure and thier children
-        rule_ids = self.env['hr.payroll.structure'].browse(
-            structure_ids).get_all_rules()
-        # run the rules by sequence
-        sorted_rule_ids = [id for id, sequence in
-                           sorted(rule_ids, key=lambda x: x[1])]
+        if structure_ids is None:
+            # get the ids of the structures on the contracts and their
+            # parent id as well
+            structure_ids = payslip._get_structure_ids(contracts)
+        # get the rules of the structure and their children, by sequence
+        sorted_rule_ids, skipped_ids, category_ancestors = self.env[
+            'hr.payroll.structure']._get_rule_plan(structure_ids)
         sorted_rules = self.env['hr.salary.rule'].browse(sorted_rule_ids)
+        category_totals = CategoryAccumulator(category_ancestors,
+                                              categories.dict)
+        if previous:
+            previous_lines = previous['lines']
+            precision = self.env['decimal.precision'].precision_get(
+                'Payroll')
+            # codes changed since the previous computation, by kind of name
+            changed = {'inputs': set(previous['changed_inputs']),
+                       'worked_days': set(previous['changed_worked_days']),
+                       'categories': set(), 'rules': set()}
+            # codes of the rules not evaluated yet in this computation
+            pending = set(sorted_rules.mapped('code'))
         for contract in contracts:
             employee = contract.employee_id
             localdict = dict(baselocaldict, employee=employee,
@@ -479,11 +874,26 @@ class HrPayslip(models.Model):
                 localdict['result'] = None
                 localdict['result_qty'] = 1.0
                 localdict['result_rate'] = 100
+                previous_line = previous and previous_lines.get(key)
                 # check if the rule can be applied
-                if rule._satisfy_condition(
-                        localdict) and rule.id not in blacklist:
-                    # compute the amount of the rule
-                    amount, qty, rate = rule._compute_rule(localdict)
+                if rule.id in blacklist:
+                    applied = False
+                elif previous and not self._is_rule_affected(
+                        previous['names'][rule.id], changed, pending):
+                    # the rule reads nothing changed: keep its result
+                    applied = bool(previous_line)
+                    if applied:
+                        amount, qty, rate = (previous_line.amount,
+                                             previous_line.quantity,
+                                             previous_line.rate)
+                else:
+                    with profiler.measure(rule.id) if profiler else \
+                            nullcontext():
+                        applied = rule._satisfy_condition(localdict)
+                        if applied:
+                            # compute the amount of the rule
+                            amount, qty, rate = rule._compute_rule(localdict)
+                if applied:
                     # check if there is already a rule computed with that code
                     previous_amount = rule.code in localdict and localdict[
                         rule.code] or 0.0
@@ -493,8 +903,8 @@ class HrPayslip(models.Model):
                     localdict[rule.code] = tot_rule
                     rules_dict[rule.code] = rule
                     # sum the amount for its salary category
-                    localdict = _sum_salary_rule_category(
-                        localdict, rule.category_id, tot_rule - previous_amount)
+                    category_totals.add(rule.category_id.id,
+                                        tot_rule - previous_amount)
                     # create/overwrite the rule in the temporary results
                     result_dict[key] = {
                         'salary_rule_id': rule.id,
@@ -505,15 +915,11 @@ class HrPayslip(models.Model):
                         'sequence': rule.sequence,
                         'appears_on_payslip': rule.appears_on_payslip,
                         'condition_select': rule.condition_select,
-                        'condition_python': rule.condition_python,
-                        'condition_range': rule.condition_range,
                         'condition_range_min': rule.condition_range_min,
                         'condition_range_max': rule.condition_range_max,
                         'amount_select': rule.amount_select,
                         'amount_fix': rule.amount_fix,
-                        'amount_python_compute': rule.amount_python_compute,
                         'amount_percentage': rule.amount_percentage,
-                        'amount_percentage_base': rule.amount_percentage_base,
                         'register_id': rule.register_id.id,
                         'amount': amount,
                         'employee_id': contract.employee_id.id,
@@ -522,10 +928,37 @@ class HrPayslip(models.Model):
                     }
                 else:
                     # blacklist this rule and its children
-                    blacklist += [id for id, seq in
-                                  rule._recursive_search_of_rules()]
+                    blacklist |= skipped_ids[rule.id]
+                if previous:
+                    pending.discard(rule.code)
+                    previous_total = previous_line and (
+                        previous_line.amount * previous_line.quantity *
+                        previous_line.rate / 100.0)
+                    total = applied and tot_rule
+                    if bool(previous_line) != applied or applied and \
+                            float_compare(total, previous_total,
+                                          precision_digits=precision):
+                        changed['rules'].add(rule.code)
+                        changed['categories'].update(
+                            code for dummy, code in
+                            category_ancestors[rule.category_id.id])
         return list(result_dict.values())
 
+    @api.model
+    def _is_rule_affected(self, names, changed, pending):
+        """
+        @param names: frozenset of the names read by the rule
+        @param changed: dict of the changed codes of the inputs,
+        worked_days, categories and rules
+        @param pending: codes of the rules not computed yet
+        @return: whether the rule has to be evaluated again
+        """
+        if names & RULE_VOLATILE_NAMES or names & pending:
+            return True
+        return bool(names & changed['rules']) or any(
+            kind in names and names & codes for kind, codes in changed.items()
+            if kind != 'rules')
+
     # YTI
     # TODO To rename. This method is not really an onchange,
     #  as it is not in any view
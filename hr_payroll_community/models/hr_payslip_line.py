@@ -54,6 +54,19 @@ class HrPayslipLine(models.Model):
     total = fields.Float(compute='_compute_total', string='Total',
                          help="Total amount for Payslip",
                          digits=dp.get_precision('Payroll'), store=True)
+    rule_version_id = fields.Many2one('hr.salary.rule.version',
+                                      string='Rule Version', readonly=True,
+                                      help="Sources of the salary rule which "
+                                           "computed the line")
+    # the sources of the rule are read from the version of the rule which
+    # computed the line instead of being copied on every line
+    condition_python = fields.Text(
+        related='rule_version_id.condition_python', required=False)
+    condition_range = fields.Char(related='rule_version_id.condition_range')
+    amount_python_compute = fields.Text(
+        related='rule_version_id.amount_python_compute')
+    amount_percentage_base = fields.Char(
+        related='rule_version_id.amount_percentage_base')
 
     @api.depends('quantity', 'amount', 'rate')
     def _compute_total(self):
@@ -75,4 +88,12 @@ class HrPayslipLine(models.Model):
                 if not values['contract_id']:
                     raise UserError(
                         _('You must set a contract to create a payslip line.'))
+        versions = self.env['hr.salary.rule.version']._get_current_versions(
+            [values['salary_rule_id'] for values in vals_list
+             if values.get('salary_rule_id') and
+             not values.get('rule_version_id')])
+        for values in vals_list:
+            if values.get('salary_rule_id') in versions and \
+                    not values.get('rule_version_id'):
+                values['rule_version_id'] = versions[values['salary_rule_id']]
         return super(HrPayslipLine, self).create(vals_list)
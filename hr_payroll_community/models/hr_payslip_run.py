@@ -22,7 +22,7 @@
 #############################################################################
 from datetime import date, datetime
 from dateutil.relativedelta import relativedelta
-from odoo import fields, models
+from odoo import api, fields, models
 
 
 class HrPayslipRun(models.Model):
@@ -55,6 +55,69 @@ class HrPayslipRun(models.Model):
                                  help="If its checked, indicates that all"
                                       "payslips generated from here are refund"
                                       "payslips.")
+    generation_total = fields.Integer(string='Expected Payslips',
+                                      readonly=True, copy=False,
+                                      help="Number of payslips expected once "
+                                           "the running parallel generation "
+                                           "is done.")
+    profile_rules = fields.Boolean(string='Profile Salary Rules',
+                                   help="Record the count, time, SQL queries "
+                                        "and errors of the evaluations of the "
+                                        "salary rules when computing the "
+                                        "payslips of the batch.")
+    generation_progress = fields.Float(string='Generation Progress',
+                                       compute='_compute_generation_progress',
+                                       help="Progress of the parallel "
+                                            "generation of the payslips.")
+
+    generation_state = fields.Selection([
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+    ], string='Generation Status', compute='_compute_generation_state',
+        help="Status of the payslips generated in the background: running "
+             "while chunks are pending, failed when a chunk could not be "
+             "generated.")
+    generation_error = fields.Text(string='Generation Error',
+                                   compute='_compute_generation_state',
+                                   help="Error of the failed chunks.")
+
+    def _compute_generation_state(self):
+        """Function for computing the status of the background generation
+        from the pending and failed jobs of the batches"""
+        jobs = self.env['hr.payroll.job'].search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('state', '!=', 'done'),
+        ]).grouped('res_id')
+        for run in self:
+            run_jobs = jobs.get(run.id, self.env['hr.payroll.job'])
+            failed = run_jobs.filtered(lambda job: job.state == 'failed')
+            run.generation_state = failed and 'failed' or (
+                run_jobs and 'running') or False
+            run.generation_error = '\n'.join(failed.mapped('error')) or False
+
+    def _run_generation_job(self, job):
+        """Function run by a payroll job: generates the payslips of the
+        employees of the job in the batch"""
+        [run_data] = self.read(['date_start', 'date_end', 'credit_note'])
+        self.env['hr.payslip.employees']._generate_payslips(
+            job.employee_ids, run_data, self.id)
+
+    def action_retry_generation(self):
+        """Function for generating again the chunks which failed"""
+        self.env['hr.payroll.job'].search([
+            ('res_model', '=', self._name),
+            ('res_id', 'in', self.ids),
+            ('state', '=', 'failed'),
+        ]).action_retry()
+        return True
+
+    @api.depends('slip_ids', 'generation_total')
+    def _compute_generation_progress(self):
+        """Function for computing the progress of the payslip generation"""
+        for run in self:
+            run.generation_progress = run.generation_total and min(
+                100.0, 100.0 * len(run.slip_ids) / run.generation_total) or 0.0
 
     def action_payslip_run(self):
         """Function for state change"""
@@ -63,3 +126,10 @@ class HrPayslipRun(models.Model):
     def close_payslip_run(self):
         """Function for state change"""
         return self.write({'state': 'close'})
+
+    def action_payslip_done(self):
+        """Function for confirming the draft payslips of the batches at
+        once"""
+        self.slip_ids.filtered(
+            lambda slip: slip.state == 'draft').action_payslip_done()
+        return True
@@ -20,10 +20,34 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import api, fields, models, _
+import dis
+from types import CodeType
+
+from odoo import api, fields, models, tools, _
 from odoo.addons import decimal_precision as dp
 from odoo.exceptions import UserError, ValidationError
-from odoo.tools.safe_eval import safe_eval
+from odoo.tools.safe_eval import (_BUILTINS, _SAFE_OPCODES, check_values,
+                                  test_expr, unsafe_eval)
+
+# Python expressions of a salary rule evaluated by the payroll engine,
+# with the mode they are compiled in
+RULE_EXPRESSION_FIELDS = {
+    'condition_python': 'exec',
+    'condition_range': 'eval',
+    'quantity': 'eval',
+    'amount_percentage_base': 'eval',
+    'amount_python_compute': 'exec',
+}
+# Variables a rule expression assigns without changing the localdict seen
+# by the next rules
+RULE_RESULT_NAMES = ('result', 'result_qty', 'result_rate')
+# Records of the localdict whose own fields are covered by the snapshot of
+# an incremental computation, unlike the fields of the records they link to
+RULE_SNAPSHOT_RECORD_NAMES = ('employee', 'contract')
+# Fields of a salary rule shaping the rule plans of the structures, the
+# category deciding which ancestors the plan holds for the rule
+RULE_PLAN_FIELDS = ('sequence', 'parent_rule_id', 'child_ids', 'active',
+                    'category_id')
 
 
 class HrSalaryRule(models.Model):
@@ -159,6 +183,138 @@ class HrSalaryRule(models.Model):
                 _('Error! You cannot create recursive hierarchy '
                   'of Salary Rules.'))
 
+    @api.model_create_multi
+    def create(self, vals_list):
+        """Drop the rule plans when a child rule is added"""
+        if self._name == 'hr.salary.rule' and any(
+                vals.get('parent_rule_id') for vals in vals_list):
+            self.env.registry.clear_cache()
+        return super(HrSalaryRule, self).create(vals_list)
+
+    def write(self, vals):
+        """Drop the compiled expressions and the rule plans when the source
+        or the hierarchy of a rule changes"""
+        if self._name == 'hr.salary.rule' and any(
+                field in vals for field in
+                (*RULE_EXPRESSION_FIELDS, *RULE_PLAN_FIELDS)):
+            self.env.registry.clear_cache()
+        return super(HrSalaryRule, self).write(vals)
+
+    def unlink(self):
+        """Drop the rule plans the deleted rules belong to"""
+        if self._name == 'hr.salary.rule':
+            self.env.registry.clear_cache()
+        return super(HrSalaryRule, self).unlink()
+
+    @api.model
+    @tools.ormcache('rule_id', 'write_date', 'field_name')
+    def _get_compiled_expression(self, rule_id, write_date, field_name):
+        """
+        Validate and compile a python expression of a salary rule once per
+        worker.
+        @param rule_id: id of the salary rule
+        @param write_date: last update of the rule, part of the cache key
+        @param field_name: one of RULE_EXPRESSION_FIELDS
+        @return: the code object checked against the safe_eval opcodes
+        """
+        return test_expr(self.browse(rule_id)[field_name], _SAFE_OPCODES,
+                         mode=RULE_EXPRESSION_FIELDS[field_name])
+
+    def _eval_expression(self, field_name, localdict):
+        """
+        Evaluate the cached code of a rule expression, with the same
+        sandbox as safe_eval. Expressions compiled in 'exec' mode write
+        their result into localdict, the others work on a copy of it.
+        """
+        self.ensure_one()
+        code = self._get_compiled_expression(self.id, self.write_date,
+                                             field_name)
+        if RULE_EXPRESSION_FIELDS[field_name] == 'exec':
+            globals_dict = localdict
+        else:
+            globals_dict = dict(localdict)
+        check_values(globals_dict)
+        globals_dict['__builtins__'] = dict(_BUILTINS)
+        return unsafe_eval(code, globals_dict)
+
+    def _get_expression_fields(self):
+        """
+        @return: the list of the expression fields evaluated to compute the
+        rule, according to its condition and amount types
+        """
+        self.ensure_one()
+        field_names = []
+        if self.condition_select == 'range':
+            field_names.append('condition_range')
+        elif self.condition_select == 'python':
+            field_names.append('condition_python')
+        if self.amount_select == 'fix':
+            field_names.append('quantity')
+        elif self.amount_select == 'percentage':
+            field_names += ['amount_percentage_base', 'quantity']
+        else:
+            field_names.append('amount_python_compute')
+        return field_names
+
+    @api.model
+    @tools.ormcache('rule_id', 'write_date')
+    def _get_expression_names(self, rule_id, write_date):
+        """
+        @param rule_id: id of the salary rule
+        @param write_date: last update of the rule, part of the cache key
+        @return: tuple (names, isolated) where names is the frozenset of the
+        names the expressions of the rule refer to, variables and attributes
+        alike, and isolated tells whether the expressions only assign the
+        result variables, so that the next rules do not depend on them
+        running, and only read the own fields of the employee and the
+        contract, e.g. contract.wage but not contract.resource_calendar_id.
+        name, the snapshot of the payslip not covering the linked records.
+        A rule whose expressions do not compile is not isolated.
+        """
+        rule = self.browse(rule_id)
+        names = set()
+        isolated = True
+        for field_name in rule._get_expression_fields():
+            try:
+                code = self._get_compiled_expression(rule_id, write_date,
+                                                     field_name)
+            except Exception:
+                return frozenset(), False
+            isolated = isolated and not any(
+                instruction.opname in ('STORE_NAME', 'STORE_GLOBAL',
+                                       'DELETE_NAME', 'DELETE_GLOBAL')
+                and instruction.argval not in RULE_RESULT_NAMES
+                for instruction in dis.get_instructions(code))
+            codes = [code]
+            while codes:
+                code = codes.pop()
+                names.update(code.co_names)
+                isolated = isolated and not self._reads_linked_records(code)
+                codes += [const for const in code.co_consts
+                          if isinstance(const, CodeType)]
+        return frozenset(names), isolated
+
+    @staticmethod
+    def _reads_linked_records(code):
+        """
+        @param code: compiled expression of a salary rule
+        @return: whether the expression reads an attribute of an attribute
+        of one of RULE_SNAPSHOT_RECORD_NAMES, a linked record
+        """
+        depth = None
+        for instruction in dis.get_instructions(code):
+            if instruction.opname in ('LOAD_NAME', 'LOAD_GLOBAL'):
+                depth = 0 if instruction.argval in \
+                    RULE_SNAPSHOT_RECORD_NAMES else None
+            elif instruction.opname in ('LOAD_ATTR', 'LOAD_METHOD'):
+                if depth is not None:
+                    depth += 1
+                    if depth > 1:
+                        return True
+            elif instruction.opname != 'EXTENDED_ARG':
+                depth = None
+        return False
+
     def _recursive_search_of_rules(self):
         """
         @return: returns a list of tuple (id, sequence) which are all the
@@ -183,7 +339,7 @@ class HrSalaryRule(models.Model):
             if rec.amount_select == 'fix':
                 try:
                     return rec.amount_fix, float(
-                        safe_eval(rec.quantity, localdict)), 100.0
+                        rec._eval_expression('quantity', localdict)), 100.0
                 except:
                     raise UserError(
                         _('Wrong quantity defined for salary rule %s (%s).') % (
@@ -191,8 +347,9 @@ class HrSalaryRule(models.Model):
             elif rec.amount_select == 'percentage':
                 try:
                     return (
-                        float(safe_eval(rec.amount_percentage_base, localdict)),
-                        float(safe_eval(rec.quantity, localdict)),
+                        float(rec._eval_expression('amount_percentage_base',
+                                                   localdict)),
+                        float(rec._eval_expression('quantity', localdict)),
                         rec.amount_percentage)
                 except:
                     raise UserError(
@@ -201,8 +358,7 @@ class HrSalaryRule(models.Model):
                             rec.name, rec.code))
             else:
                 try:
-                    safe_eval(rec.amount_python_compute, localdict, mode='exec',
-                              nocopy=True)
+                    rec._eval_expression('amount_python_compute', localdict)
                     return (float(localdict['result']),
                             'result_qty' in localdict and
                             localdict['result_qty'] or 1.0, 'result_rate'
@@ -224,7 +380,7 @@ class HrSalaryRule(models.Model):
             return True
         elif self.condition_select == 'range':
             try:
-                result = safe_eval(self.condition_range, localdict)
+                result = self._eval_expression('condition_range', localdict)
                 return (
                             self.condition_range_min <= result <= self.condition_range_max or False)
             except:
@@ -234,8 +390,7 @@ class HrSalaryRule(models.Model):
                         self.name, self.code))
         else:  # python code
             try:
-                safe_eval(self.condition_python, localdict, mode='exec',
-                          nocopy=True)
+                self._eval_expression('condition_python', localdict)
                 return 'result' in localdict and localdict['result'] or False
             except:
                 raise UserError(
@@ -20,10 +20,31 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import api, fields, models, _
+from odoo import api, fields, models, tools, _
 from odoo.exceptions import ValidationError
 
 
+class CategoryAccumulator(object):
+    """Totals of salary rule categories by code: an amount added to a
+    category is added to all its parent categories as well, walking a
+    precomputed ancestor table instead of the parent_id chain"""
+
+    def __init__(self, ancestors, totals=None):
+        """
+        @param ancestors: dict mapping a category id to the tuple of the
+        (id, code) of its ancestors, as returned by _get_ancestor_table
+        @param totals: dict of the totals by category code to update
+        """
+        self.ancestors = ancestors
+        self.totals = {} if totals is None else totals
+
+    def add(self, category_id, amount):
+        """Function for adding an amount to a category and its parents"""
+        totals = self.totals
+        for ancestor_id, code in self.ancestors[category_id]:
+            totals[code] = totals.get(code, 0.0) + amount
+
+
 class HrSalaryRuleCategory(models.Model):
     """Create new model for Salary Rule Category"""
     _name = 'hr.salary.rule.category'
@@ -54,3 +75,36 @@ class HrSalaryRuleCategory(models.Model):
             raise ValidationError(
                 _('Error! You cannot create recursive '
                   'hierarchy of Salary Rule Category.'))
+
+    def write(self, vals):
+        """Drop the ancestor tables when the hierarchy changes"""
+        if 'parent_id' in vals or 'code' in vals:
+            self.env.registry.clear_cache()
+        return super(HrSalaryRuleCategory, self).write(vals)
+
+    def unlink(self):
+        """Drop the ancestor tables of the deleted categories"""
+        self.env.registry.clear_cache()
+        return super(HrSalaryRuleCategory, self).unlink()
+
+    @api.model
+    @tools.ormcache('category_ids')
+    def _get_ancestor_table(self, category_ids):
+        """
+        @param category_ids: sorted tuple of ids of salary rule categories
+        @return: dict mapping each category id to the tuple of the (id, code)
+        of its ancestors, the root category first and itself last
+        """
+        table = {}
+
+        def _get_ancestors(category):
+            """Function for getting the ancestors of a category"""
+            if category.id not in table:
+                parents = category.parent_id and _get_ancestors(
+                    category.parent_id) or ()
+                table[category.id] = parents + ((category.id, category.code),)
+            return table[category.id]
+
+        for category in self.browse(category_ids):
+            _get_ancestors(category)
+        return table
@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import time
+from contextlib import contextmanager
+
+from odoo import api, fields, models
+from odoo.tools.sql import create_unique_index
+
+
+class RuleProfiler(object):
+    """Statistics of the evaluations of salary rules by the rule engine:
+    count, time, SQL queries and errors of the evaluations of each rule"""
+
+    def __init__(self, cr):
+        """
+        @param cr: cursor whose queries are counted
+        """
+        self.cr = cr
+        self.stats = {}
+
+    @contextmanager
+    def measure(self, rule_id):
+        """Function for measuring an evaluation of a rule"""
+        stats = self.stats.setdefault(rule_id, {
+            'evaluation_count': 0, 'duration': 0.0, 'query_count': 0,
+            'error_count': 0, 'last_error': False})
+        start = time.perf_counter()
+        queries = self.cr.sql_log_count
+        try:
+            yield
+        except Exception as e:
+            stats['error_count'] += 1
+            stats['last_error'] = str(e)
+            raise
+        finally:
+            stats['evaluation_count'] += 1
+            stats['duration'] += time.perf_counter() - start
+            stats['query_count'] += self.cr.sql_log_count - queries
+
+
+class HrSalaryRuleProfile(models.Model):
+    """Create new model for recording the cost of the salary rules"""
+    _name = 'hr.salary.rule.profile'
+    _description = 'Salary Rule Profile'
+    _order = 'duration desc'
+
+    rule_id = fields.Many2one('hr.salary.rule', string='Salary Rule',
+                              required=True, index=True, ondelete='cascade',
+                              help="Profiled salary rule")
+    payslip_run_id = fields.Many2one('hr.payslip.run',
+                                     string='Payslip Batch', index=True,
+                                     ondelete='cascade',
+                                     help="Batch whose payslips evaluated "
+                                          "the rule, empty for the payslips "
+                                          "out of batches")
+    evaluation_count = fields.Integer(string='Evaluations',
+                                      help="Number of evaluations of the "
+                                           "rule")
+    duration = fields.Float(string='Time (s)', digits=(16, 4),
+                            help="Cumulative time spent evaluating the rule")
+    average_duration = fields.Float(string='Average Time (ms)',
+                                    digits=(16, 3),
+                                    compute='_compute_average_duration',
+                                    help="Average time of an evaluation")
+    query_count = fields.Integer(string='SQL Queries',
+                                 help="Number of SQL queries run by the "
+                                      "evaluations of the rule")
+    error_count = fields.Integer(string='Errors',
+                                 help="Number of evaluations which failed")
+    last_error = fields.Text(string='Last Error',
+                             help="Message of the last failed evaluation")
+
+    def init(self):
+        """Function for profiling a rule once per batch, the payslips out of
+        batches included, which a unique constraint would let through as
+        NULL batches"""
+        create_unique_index(self.env.cr,
+                            'hr_salary_rule_profile_rule_run_uniq_index',
+                            self._table,
+                            ['rule_id', 'COALESCE(payslip_run_id, 0)'])
+
+    @api.depends('duration', 'evaluation_count')
+    def _compute_average_duration(self):
+        """Function for computing the average time of an evaluation"""
+        for profile in self:
+            profile.average_duration = profile.evaluation_count and (
+                1000.0 * profile.duration / profile.evaluation_count)
+
+    @api.model
+    def _record(self, payslip_run_id, profiler):
+        """
+        Add the statistics of a profiler to the profiles of a batch, with a
+        single upsert so that the workers computing the chunks of a batch at
+        the same time do not collide on the profiles they create.
+        @param payslip_run_id: id of the batch, False for the payslips out of
+        batches
+        @param profiler: RuleProfiler of the computation
+        """
+        if not profiler.stats:
+            return
+        self.flush_model()
+        rule_ids = list(profiler.stats)
+        stats = [profiler.stats[rule_id] for rule_id in rule_ids]
+        self.env.cr.execute("""
+            INSERT INTO hr_salary_rule_profile
+                   (rule_id, payslip_run_id, evaluation_count, duration,
+                    query_count, error_count, last_error, create_uid,
+                    create_date, write_uid, write_date)
+            SELECT rule_id, %s, evaluation_count, duration, query_count,
+                   error_count, last_error, %s, now() AT TIME ZONE 'UTC', %s,
+                   now() AT TIME ZONE 'UTC'
+              FROM unnest(%s::int[], %s::int[], %s::float8[], %s::int[],
+                          %s::int[], %s::text[])
+                AS stats(rule_id, evaluation_count, duration, query_count,
+                         error_count, last_error)
+            ON CONFLICT (rule_id, COALESCE(payslip_run_id, 0)) DO UPDATE SET
+                evaluation_count = hr_salary_rule_profile.evaluation_count
+                    + EXCLUDED.evaluation_count,
+                duration = hr_salary_rule_profile.duration
+                    + EXCLUDED.duration,
+                query_count = hr_salary_rule_profile.query_count
+                    + EXCLUDED.query_count,
+                error_count = hr_salary_rule_profile.error_count
+                    + EXCLUDED.error_count,
+                last_error = COALESCE(EXCLUDED.last_error,
+                                      hr_salary_rule_profile.last_error),
+                write_uid = EXCLUDED.write_uid,
+                write_date = EXCLUDED.write_date
+        """, [payslip_run_id or None, self.env.uid, self.env.uid, rule_ids,
+              [stat['evaluation_count'] for stat in stats],
+              [stat['duration'] for stat in stats],
+              [stat['query_count'] for stat in stats],
+              [stat['error_count'] for stat in stats],
+              [stat['last_error'] or None for stat in stats]])
+        self.invalidate_model()
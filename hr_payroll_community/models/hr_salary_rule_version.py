@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from odoo import api, fields, models
+
+# Fields of a salary rule computing the amounts of the payslip lines, kept
+# by the rule versions
+RULE_VERSION_FIELDS = ('condition_python', 'condition_range',
+                       'amount_python_compute', 'amount_percentage_base')
+
+
+class HrSalaryRuleVersion(models.Model):
+    """Create new model for keeping the sources of the salary rules which
+    computed the payslip lines, one record per edition of a rule"""
+    _name = 'hr.salary.rule.version'
+    _description = 'Salary Rule Version'
+    _order = 'rule_id, id desc'
+
+    rule_id = fields.Many2one('hr.salary.rule', string='Salary Rule',
+                              required=True, index=True, readonly=True,
+                              ondelete='cascade',
+                              help="Salary rule of the version")
+    condition_python = fields.Text(string='Python Condition', readonly=True,
+                                   help="Python condition of the rule")
+    condition_range = fields.Char(string='Range Based on', readonly=True,
+                                  help="Range expression of the rule")
+    amount_python_compute = fields.Text(string='Python Code', readonly=True,
+                                        help="Python code computing the "
+                                             "amount of the rule")
+    amount_percentage_base = fields.Char(string='Percentage based on',
+                                         readonly=True,
+                                         help="Base of the percentage of "
+                                              "the rule")
+
+    @api.model
+    def _get_current_versions(self, rule_ids):
+        """
+        @param rule_ids: ids of salary rules
+        @return: dict mapping each rule id to the id of the version holding
+        its current sources, created when the rule changed since its last
+        version
+        """
+        rules = self.env['hr.salary.rule'].browse(set(rule_ids))
+        latest = {rule.id: version_id for rule, version_id in
+                  self.sudo()._read_group([('rule_id', 'in', rules.ids)],
+                                          ['rule_id'], ['id:max'])}
+        versions = self.sudo().browse(latest.values())
+        result = {}
+        vals_list = []
+        for rule in rules:
+            values = {name: rule[name] for name in RULE_VERSION_FIELDS}
+            version = versions.browse(latest.get(rule.id))
+            if version and all(version[name] == value
+                               for name, value in values.items()):
+                result[rule.id] = version.id
+            else:
+                vals_list.append(dict(values, rule_id=rule.id))
+        for version in self.sudo().create(vals_list):
+            result[version.rule_id.id] = version.id
+        return result
@@ -26,6 +26,7 @@ from datetime import timedelta
 from pytz import utc
 
 from odoo import models
+from odoo.addons.resource.models.utils import Intervals
 from odoo.tools import float_utils
 
 # This will generate 16th of days
@@ -86,3 +87,63 @@ class ResourceMixin(models.AbstractModel):
             'days': days,
             'hours': sum(day_hours.values()),
         }
+
+    def _get_payroll_work_data_batch(self, from_datetime, to_datetime,
+                                     calendar):
+        """
+            Batched version of `list_leaves` and `get_work_days_data` for
+            records working with the same `calendar`: the attendance and the
+            leave intervals of all the resources are computed with one call
+            each, and every figure is derived from these shared intervals.
+
+            Returns a tuple (data, calendar_hours) where data maps the id of
+            each record to a dict {'leaves': [(day, hours, leaves)],
+            'days': n, 'hours': h} and calendar_hours maps a day to the
+            working hours of the calendar, leaves not deduced.
+        """
+        resources = self.resource_id
+        # naive datetime are made explicit in UTC
+        if not from_datetime.tzinfo:
+            from_datetime = from_datetime.replace(tzinfo=utc)
+        if not to_datetime.tzinfo:
+            to_datetime = to_datetime.replace(tzinfo=utc)
+        # attendances with one extra day margin, in order to compute the
+        # total hours on the first and last days
+        from_full = from_datetime - timedelta(days=1)
+        to_full = to_datetime + timedelta(days=1)
+        attendances = calendar._attendance_intervals_batch(from_full, to_full,
+                                                           resources)
+        leaves = calendar._leave_intervals_batch(from_datetime, to_datetime,
+                                                 resources)
+        period = Intervals([(from_datetime, to_datetime,
+                             self.env['resource.calendar.attendance'])])
+        # the intervals without resource are the ones of the calendar itself
+        calendar_hours = defaultdict(float)
+        for start, stop, meta in attendances[False]:
+            calendar_hours[start.date()] += \
+                (stop - start).total_seconds() / 3600
+        result = {}
+        for record in self:
+            resource = record.resource_id
+            day_total = defaultdict(float)
+            for start, stop, meta in attendances[resource.id]:
+                day_total[start.date()] += (stop - start).total_seconds() / 3600
+            attendance = attendances[resource.id] & period
+            day_leaves = [
+                (start.date(), (stop - start).total_seconds() / 3600, leave)
+                for start, stop, leave in leaves[resource.id] & attendance
+            ]
+            day_hours = defaultdict(float)
+            for start, stop, meta in attendance - leaves[resource.id]:
+                day_hours[start.date()] += (stop - start).total_seconds() / 3600
+            result[record.id] = {
+                'leaves': day_leaves,
+                # compute number of days as quarters
+                'days': sum(
+                    float_utils.round(ROUNDING_FACTOR * day_hours[day] /
+                                      day_total[day]) / ROUNDING_FACTOR
+                    for day in day_hours
+                ),
+                'hours': sum(day_hours.values()),
+            }
+        return result, calendar_hours
@@ -32,22 +32,49 @@ class ReportHrPayrollCommunityReportContributionRegister(models.AbstractModel):
     _description = 'Payroll Contribution Register Report'
 
     def _get_payslip_lines(self, register_ids, date_from, date_to):
-        """Function for getting Payslip Lines to Contribution Register Report"""
+        """Function for getting Payslip Lines to Contribution Register Report
+        @return: dict mapping each register id to the list of the dicts of
+        its done payslip lines, each line carrying the 'slip_total' of the
+        lines of its payslip in the register and whether it is the
+        'slip_last' of them
+        """
         result = {}
+        self.env['hr.payslip.line'].flush_model()
+        self.env['hr.payslip'].flush_model(['name', 'date_from', 'date_to',
+                                            'state'])
         self.env.cr.execute("""
-            SELECT pl.id from hr_payslip_line as pl
+            SELECT pl.register_id, pl.slip_id, hp.name AS slip_name, pl.code,
+                COALESCE(pl.name->>%s, pl.name->>'en_US') AS name,
+                pl.quantity, pl.amount, pl.total,
+                SUM(pl.total) OVER slip AS slip_total,
+                COUNT(*) OVER (slip ORDER BY pl.sequence, pl.id) =
+                    COUNT(*) OVER slip AS slip_last
+            FROM hr_payslip_line as pl
             LEFT JOIN hr_payslip AS hp on (pl.slip_id = hp.id)
             WHERE (hp.date_from >= %s) AND (hp.date_to <= %s)
             AND pl.register_id in %s
             AND hp.state = 'done'
-            ORDER BY pl.slip_id, pl.sequence""",
-                            (date_from, date_to, tuple(register_ids)))
-        line_ids = [x[0] for x in self.env.cr.fetchall()]
-        for line in self.env['hr.payslip.line'].browse(line_ids):
-            result.setdefault(line.register_id.id, self.env['hr.payslip.line'])
-            result[line.register_id.id] += line
+            WINDOW slip AS (PARTITION BY pl.register_id, pl.slip_id)
+            ORDER BY pl.slip_id, pl.sequence, pl.id""",
+                            (self.env.lang or 'en_US', date_from, date_to,
+                             tuple(register_ids)))
+        for line in self.env.cr.dictfetchall():
+            result.setdefault(line['register_id'], []).append(line)
         return result
 
+    def _get_register_totals(self, register_ids, date_from, date_to):
+        """Function for getting the totals of the done payslip lines of the
+        Contribution Registers"""
+        self.env.cr.execute("""
+            SELECT pl.register_id, SUM(pl.total) from hr_payslip_line as pl
+            LEFT JOIN hr_payslip AS hp on (pl.slip_id = hp.id)
+            WHERE (hp.date_from >= %s) AND (hp.date_to <= %s)
+            AND pl.register_id in %s
+            AND hp.state = 'done'
+            GROUP BY pl.register_id""",
+                            (date_from, date_to, tuple(register_ids)))
+        return dict(self.env.cr.fetchall())
+
     @api.model
     def _get_report_values(self, docids, data=None):
         """Function for getting Contribution Register Values"""
@@ -64,11 +91,10 @@ class ReportHrPayrollCommunityReportContributionRegister(models.AbstractModel):
                                                                       days=-1))[
                                    :10])
         lines_data = self._get_payslip_lines(register_ids, date_from, date_to)
-        lines_total = {}
-        for register in contrib_registers:
-            lines = lines_data.get(register.id)
-            lines_total[register.id] = lines and sum(
-                lines.mapped('total')) or 0.0
+        register_totals = self._get_register_totals(register_ids, date_from,
+                                                    date_to)
+        lines_total = {register.id: register_totals.get(register.id) or 0.0
+                       for register in contrib_registers}
         return {
             'doc_ids': docids,
             'doc_model': 'hr.contribution.register',
@@ -28,86 +28,102 @@ class ReportHrPayrollCommunityReportPayslipDetails(models.AbstractModel):
     _name = 'report.hr_payroll_community.report_payslipdetails'
     _description = 'Payslip Details Report'
 
-    def get_details_by_rule_category(self, payslip_lines):
-        """Function for get Salary Rule Categories"""
-        PayslipLine = self.env['hr.payslip.line']
-        RuleCateg = self.env['hr.salary.rule.category']
+    def _get_report_lines(self, payslip_ids):
+        """
+        @param payslip_ids: ids of the payslips to print
+        @return: list of the dicts of the payslip lines appearing on the
+        payslips, read with a single query, in the order of the categories
+        report
+        """
+        if not payslip_ids:
+            return []
+        self.env['hr.payslip.line'].flush_model()
+        self.env.cr.execute("""
+            SELECT pl.id, pl.slip_id, pl.contract_id, pl.sequence,
+                pl.category_id, pl.register_id, rr.name AS register_name,
+                COALESCE(pl.name->>%s, pl.name->>'en_US') AS name, pl.code,
+                pl.quantity, pl.amount, pl.total
+            FROM hr_payslip_line AS pl
+            LEFT JOIN hr_salary_rule_category AS rc ON
+                (pl.category_id = rc.id)
+            LEFT JOIN hr_contribution_register AS rr ON
+                (pl.register_id = rr.id)
+            WHERE pl.slip_id IN %s AND pl.appears_on_payslip
+            ORDER BY pl.sequence, rc.parent_id, pl.id""",
+                            (self.env.lang or 'en_US', tuple(payslip_ids)))
+        return self.env.cr.dictfetchall()
 
-        def get_recursive_parent(current_rule_category, rule_categories=None):
-            """Function for return Rule Categories with respect to Parent
-            Category"""
-            if rule_categories:
-                rule_categories = current_rule_category | rule_categories
-            else:
-                rule_categories = current_rule_category
-            if current_rule_category.parent_id:
-                return get_recursive_parent(current_rule_category.parent_id,
-                                            rule_categories)
-            else:
-                return rule_categories
+    def get_details_by_rule_category(self, lines):
+        """Function for get Salary Rule Categories
+        @param lines: dicts of the payslip lines, as returned by
+        _get_report_lines
+        """
+        RuleCateg = self.env['hr.salary.rule.category']
         res = {}
         result = {}
-        if payslip_lines:
-            self.env.cr.execute("""
-                SELECT pl.id, pl.category_id, pl.slip_id FROM 
-                hr_payslip_line as pl
-                LEFT JOIN hr_salary_rule_category AS rc on 
-                (pl.category_id = rc.id)
-                WHERE pl.id in %s
-                GROUP BY rc.parent_id, pl.sequence, pl.id, pl.category_id
-                ORDER BY pl.sequence, rc.parent_id""",
-                                (tuple(payslip_lines.ids),))
-            for x in self.env.cr.fetchall():
-                result.setdefault(x[2], {})
-                result[x[2]].setdefault(x[1], [])
-                result[x[2]][x[1]].append(x[0])
-            for payslip_id, lines_dict in result.items():
-                res.setdefault(payslip_id, [])
-                for rule_categ_id, line_ids in lines_dict.items():
-                    rule_categories = RuleCateg.browse(rule_categ_id)
-                    lines = PayslipLine.browse(line_ids)
-                    level = 0
-                    for parent in get_recursive_parent(rule_categories):
-                        res[payslip_id].append({
-                            'rule_category': parent.name,
-                            'name': parent.name,
-                            'code': parent.code,
-                            'level': level,
-                            'total': sum(lines.mapped('total')),
-                        })
-                        level += 1
-                    for line in lines:
-                        res[payslip_id].append({
-                            'rule_category': line.name,
-                            'name': line.name,
-                            'code': line.code,
-                            'total': line.total,
-                            'level': level
-                        })
+        for line in lines:
+            if line['category_id']:
+                result.setdefault(line['slip_id'], {}).setdefault(
+                    line['category_id'], []).append(line)
+        # ancestors of each category, the root category first
+        ancestors = RuleCateg._get_ancestor_table(tuple(sorted(
+            {line['category_id'] for line in lines if line['category_id']})))
+        names = {category.id: category.name for category in RuleCateg.browse(
+            {categ_id for table in ancestors.values()
+             for categ_id, code in table})}
+        for payslip_id, lines_dict in result.items():
+            res.setdefault(payslip_id, [])
+            for rule_categ_id, categ_lines in lines_dict.items():
+                total = sum(line['total'] for line in categ_lines)
+                level = 0
+                for categ_id, code in ancestors[rule_categ_id]:
+                    res[payslip_id].append({
+                        'rule_category': names[categ_id],
+                        'name': names[categ_id],
+                        'code': code,
+                        'level': level,
+                        'total': total,
+                    })
+                    level += 1
+                for line in categ_lines:
+                    res[payslip_id].append({
+                        'rule_category': line['name'],
+                        'name': line['name'],
+                        'code': line['code'],
+                        'total': line['total'],
+                        'level': level
+                    })
         return res
 
-    def get_lines_by_contribution_register(self, payslip_lines):
-        """Function for getting Contribution Register Lines"""
+    def get_lines_by_contribution_register(self, lines):
+        """Function for getting Contribution Register Lines
+        @param lines: dicts of the payslip lines, as returned by
+        _get_report_lines
+        """
         result = {}
         res = {}
-        for line in payslip_lines.filtered('register_id'):
-            result.setdefault(line.slip_id.id, {})
-            result[line.slip_id.id].setdefault(line.register_id, line)
-            result[line.slip_id.id][line.register_id] |= line
+        # payslip lines order
+        for line in sorted(lines, key=lambda line: (
+                line['contract_id'], line['sequence'], line['id'])):
+            if line['register_id']:
+                result.setdefault(line['slip_id'], {}).setdefault(
+                    (line['register_id'], line['register_name']),
+                    []).append(line)
         for payslip_id, lines_dict in result.items():
             res.setdefault(payslip_id, [])
-            for register, lines in lines_dict.items():
+            for (register_id, register_name), register_lines in \
+                    lines_dict.items():
                 res[payslip_id].append({
-                    'register_name': register.name,
-                    'total': sum(lines.mapped('total')),
+                    'register_name': register_name,
+                    'total': sum(line['total'] for line in register_lines),
                 })
-                for line in lines:
+                for line in register_lines:
                     res[payslip_id].append({
-                        'name': line.name,
-                        'code': line.code,
-                        'quantity': line.quantity,
-                        'amount': line.amount,
-                        'total': line.total,
+                        'name': line['name'],
+                        'code': line['code'],
+                        'quantity': line['quantity'],
+                        'amount': line['amount'],
+                        'total': line['total'],
                     })
         return res
 
@@ -115,16 +131,14 @@ class ReportHrPayrollCommunityReportPayslipDetails(models.AbstractModel):
     def _get_report_values(self, docids, data=None):
         """Function for getting Payslip Details Report values"""
         payslips = self.env['hr.payslip'].browse(docids)
+        lines = self._get_report_lines(payslips.ids)
         return {
             'doc_ids': docids,
             'doc_model': 'hr.payslip',
             'docs': payslips,
             'data': data,
             'get_details_by_rule_category': self.get_details_by_rule_category(
-                payslips.mapped('details_by_salary_rule_category_ids').filtered(
-                    lambda r: r.appears_on_payslip)),
+                lines),
             'get_lines_by_contribution_register':
-                self.get_lines_by_contribution_register(
-                payslips.mapped('line_ids').filtered(
-                    lambda r: r.appears_on_payslip)),
+                self.get_lines_by_contribution_register(lines),
         }
@@ -0,0 +1,96 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from datetime import date
+
+from dateutil.relativedelta import relativedelta
+from odoo.tests import common
+
+
+class PayrollTestCommon(common.TransactionCase):
+    """ Employees with their contracts on a small salary structure: a
+    python rule on the wage, a rule adding the BONUS input, the gross and
+    the net."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(PayrollTestCommon, cls).setUpClass()
+        cls.date_from = date.today().replace(day=1)
+        cls.date_to = cls.date_from + relativedelta(months=1, days=-1)
+        cls.categories = {
+            code: cls.env.ref('hr_payroll_community.%s' % code)
+            for code in ('BASIC', 'ALW', 'GROSS', 'NET')
+        }
+        cls.calendar = cls.env['resource.calendar'].create({
+            'name': 'Payroll Test Calendar',
+            'company_id': cls.env.company.id,
+        })
+        cls.structure = cls.env['hr.payroll.structure'].create({
+            'name': 'Payroll Test Structure',
+            'code': 'PAYTEST',
+            'company_id': cls.env.company.id,
+            'rule_ids': [(6, 0, cls._create_rules([
+                ('BASIC', 'BASIC', 1, 'result = contract.wage'),
+                ('BONUS', 'ALW', 10,
+                 'result = inputs.BONUS and inputs.BONUS.amount or 0.0'),
+                ('GROSS', 'GROSS', 100,
+                 'result = categories.BASIC + categories.ALW'),
+                ('NET', 'NET', 200, 'result = categories.GROSS'),
+            ]).ids)],
+        })
+
+    @classmethod
+    def _create_rules(cls, rules):
+        """Python rules, from (code, category, sequence, code) tuples"""
+        return cls.env['hr.salary.rule'].create([{
+            'name': 'Payroll Test %s' % code,
+            'code': code,
+            'sequence': sequence,
+            'category_id': cls.categories[category].id,
+            'amount_select': 'code',
+            'amount_python_compute': python_code,
+        } for code, category, sequence, python_code in rules])
+
+    @classmethod
+    def _create_employees(cls, count):
+        """Employees with an open contract on the test structure"""
+        employees = cls.env['hr.employee'].create([{
+            'name': 'Payroll Test Employee %s' % index,
+            'company_id': cls.env.company.id,
+            'resource_calendar_id': cls.calendar.id,
+        } for index in range(count)])
+        cls.env['hr.contract'].create([{
+            'name': 'Payroll Test Contract %s' % employee.name,
+            'employee_id': employee.id,
+            'company_id': cls.env.company.id,
+            'resource_calendar_id': cls.calendar.id,
+            'struct_id': cls.structure.id,
+            'wage': 1000.0 + 100.0 * index,
+            'date_start': cls.date_from - relativedelta(years=1),
+            'state': 'open',
+        } for index, employee in enumerate(employees)])
+        return employees
+
+    def _get_lines(self, payslips):
+        """Totals of the lines of the payslips, by employee and code"""
+        return {(line.employee_id.id, line.code): line.total
+                for line in payslips.line_ids}
@@ -0,0 +1,252 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import logging
+import os
+import time
+from contextlib import contextmanager
+from datetime import date, datetime, time as dt_time
+
+from dateutil.relativedelta import relativedelta
+from odoo.tests import common, tagged
+
+_logger = logging.getLogger(__name__)
+
+
+@tagged('-standard', 'post_install', '-at_install', 'payroll_benchmark')
+class TestPayrollBenchmark(common.TransactionCase):
+    """ Times the payroll of a synthetic workforce. Not part of the standard
+    test run: launch it with --test-tags payroll_benchmark, the numbers of
+    employees being read from the PAYROLL_BENCHMARK_SIZES environment
+    variable, e.g. PAYROLL_BENCHMARK_SIZES=100,1000,10000."""
+
+    def setUp(self):
+        super(TestPayrollBenchmark, self).setUp()
+        self.date_from = date.today().replace(day=1)
+        self.date_to = self.date_from + relativedelta(months=1, days=-1)
+        self.company = self.env.company
+        self.calendar = self.env['resource.calendar'].create({
+            'name': 'Benchmark Calendar',
+            'company_id': self.company.id,
+        })
+        self.register = self.env['hr.contribution.register'].create({
+            'name': 'Benchmark Register',
+        })
+        self.structure = self._create_structure()
+
+    def _create_structure(self):
+        """Structure mixing fixed, percentage, python and range rules, with
+        a child rule and a year-to-date rule"""
+        categories = {
+            code: self.env.ref('hr_payroll_community.%s' % code)
+            for code in ('BASIC', 'ALW', 'GROSS', 'DED', 'NET')
+        }
+        rules = [
+            ('BASIC', 'BASIC', 1, {
+                'amount_select': 'code',
+                'amount_python_compute': 'result = contract.wage'}),
+            ('HRA', 'ALW', 10, {
+                'amount_select': 'percentage',
+                'amount_percentage_base': 'contract.wage',
+                'amount_percentage': 40.0}),
+            ('MEAL', 'ALW', 20, {
+                'amount_select': 'fix',
+                'amount_fix': 8.0,
+                'quantity': 'worked_days.WORK100 and '
+                            'worked_days.WORK100.number_of_days or 0'}),
+            ('BONUS', 'ALW', 30, {
+                'condition_select': 'range',
+                'condition_range': 'contract.wage',
+                'condition_range_min': 0.0,
+                'condition_range_max': 3000.0,
+                'amount_select': 'fix',
+                'amount_fix': 150.0}),
+            ('GROSS', 'GROSS', 100, {
+                'amount_select': 'code',
+                'amount_python_compute':
+                    'result = categories.BASIC + categories.ALW'}),
+            ('PF', 'DED', 120, {
+                'condition_select': 'python',
+                'condition_python': 'result = categories.GROSS > 2000',
+                'amount_select': 'code',
+                'amount_python_compute':
+                    'result = -categories.BASIC * 0.12'}),
+            ('YTD', 'DED', 130, {
+                'amount_select': 'code',
+                'amount_python_compute':
+                    'result = -0.001 * payslip.sum('
+                    '"GROSS", payslip.date_from.replace(month=1, day=1), '
+                    'payslip.date_to)'}),
+            ('NET', 'NET', 200, {
+                'amount_select': 'code',
+                'amount_python_compute':
+                    'result = categories.BASIC + categories.ALW '
+                    '+ categories.DED',
+                'register_id': self.register.id}),
+        ]
+        rule_ids = self.env['hr.salary.rule'].create([dict(
+            values, name='Benchmark %s' % code, code=code, sequence=sequence,
+            category_id=categories[category].id,
+        ) for code, category, sequence, values in rules]).ids
+        # a child rule, only computed when its parent applies
+        self.env['hr.salary.rule'].create({
+            'name': 'Benchmark PF Employer',
+            'code': 'PFE',
+            'sequence': 125,
+            'category_id': categories['DED'].id,
+            'parent_rule_id': rule_ids[5],
+            'amount_select': 'percentage',
+            'amount_percentage_base': 'contract.wage',
+            'amount_percentage': 0.5,
+            'register_id': self.register.id,
+        })
+        if 'hr.loan' in self.env:
+            rule_ids.append(self._create_input_rule('LO', categories['DED']))
+        if 'salary.advance' in self.env:
+            rule_ids.append(self._create_input_rule('SAR', categories['DED']))
+        if 'account_debit_id' in self.env['hr.salary.rule']._fields:
+            # payroll accounting installed: confirming posts journal entries
+            Account = self.env['account.account']
+            self.env['hr.salary.rule'].browse(rule_ids[0]).write({
+                'account_debit_id': Account.search(
+                    [('account_type', '=', 'expense')], limit=1).id,
+                'account_credit_id': Account.search(
+                    [('account_type', '=', 'liability_current')], limit=1).id,
+            })
+        return self.env['hr.payroll.structure'].create({
+            'name': 'Benchmark Structure',
+            'code': 'BENCH',
+            'company_id': self.company.id,
+            'rule_ids': [(6, 0, rule_ids)],
+        })
+
+    def _create_input_rule(self, code, category):
+        """Rule deducting the amount of the input of the same code"""
+        return self.env['hr.salary.rule'].create({
+            'name': 'Benchmark %s' % code,
+            'code': code,
+            'sequence': 190,
+            'category_id': category.id,
+            'amount_select': 'code',
+            'amount_python_compute':
+                'result = inputs.%s and - (inputs.%s.amount)' % (code, code),
+            'input_ids': [(0, 0, {'name': code, 'code': code})],
+        }).id
+
+    def _generate_workforce(self, size):
+        """Employees with their contracts, some leaves, and loans and
+        salary advances when those modules are installed"""
+        employees = self.env['hr.employee'].create([{
+            'name': 'Benchmark Employee %s' % index,
+            'company_id': self.company.id,
+            'resource_calendar_id': self.calendar.id,
+        } for index in range(size)])
+        self.env['hr.contract'].create([{
+            'name': 'Benchmark Contract %s' % employee.name,
+            'employee_id': employee.id,
+            'company_id': self.company.id,
+            'resource_calendar_id': self.calendar.id,
+            'struct_id': self.structure.id,
+            'wage': 1000.0 + 100.0 * (index % 40),
+            'date_start': self.date_from - relativedelta(years=1),
+            'state': 'open',
+        } for index, employee in enumerate(employees)])
+        leave_day = self.date_from + relativedelta(days=9)
+        self.env['resource.calendar.leaves'].create([{
+            'name': 'Benchmark Leave',
+            'calendar_id': self.calendar.id,
+            'resource_id': employee.resource_id.id,
+            'date_from': datetime.combine(leave_day, dt_time(8, 0)),
+            'date_to': datetime.combine(leave_day, dt_time(17, 0)),
+            'time_type': 'leave',
+        } for employee in employees[::5]])
+        if 'hr.loan' in self.env:
+            loans = self.env['hr.loan']
+            for employee in employees[::10]:
+                loans += self.env['hr.loan'].create({
+                    'employee_id': employee.id,
+                    'loan_amount': 1200.0,
+                    'installment': 12,
+                    'payment_date': self.date_from,
+                })
+            loans.action_compute_installment()
+            loans.write({'state': 'approve'})
+        if 'salary.advance' in self.env:
+            self.env['salary.advance'].create([{
+                'employee_id': employee.id,
+                'advance': 200.0,
+                'date': self.date_from,
+            } for employee in employees[3::10]]).write({'state': 'approve'})
+        return employees
+
+    @contextmanager
+    def _measure(self, timings, phase):
+        """Records the time and the number of SQL queries of a phase"""
+        self.env.flush_all()
+        self.env.invalidate_all()
+        queries = self.env.cr.sql_log_count
+        start = time.perf_counter()
+        yield
+        self.env.flush_all()
+        timings.append((phase, time.perf_counter() - start,
+                        self.env.cr.sql_log_count - queries))
+
+    def _run_payroll(self, employees):
+        """Runs and times every phase of the payroll of the employees"""
+        timings = []
+        run = self.env['hr.payslip.run'].create({
+            'name': 'Benchmark %s' % len(employees),
+            'date_start': self.date_from,
+            'date_end': self.date_to,
+        })
+        wizard = self.env['hr.payslip.employees'].with_context(
+            active_id=run.id).create({'employee_ids': [(6, 0, employees.ids)]})
+        with self._measure(timings, 'generate payslips'):
+            wizard.action_compute_sheet()
+        payslips = run.slip_ids
+        with self._measure(timings, 'compute sheet'):
+            payslips.action_compute_sheet()
+        with self._measure(timings, 'confirm payslips'):
+            payslips.action_payslip_done()
+        report = self.env['ir.actions.report']
+        with self._measure(timings, 'payslip details report'):
+            report._render_qweb_html(
+                'hr_payroll_community.report_payslipdetails', payslips.ids)
+        with self._measure(timings, 'contribution register report'):
+            report.with_context(active_ids=self.register.ids)._render_qweb_html(
+                'hr_payroll_community.report_contributionregister',
+                self.register.ids, data={'form': {
+                    'date_from': self.date_from, 'date_to': self.date_to}})
+        self.assertEqual(len(payslips), len(employees))
+        self.assertTrue(all(slip.state == 'done' for slip in payslips))
+        return timings
+
+    def test_payroll_benchmark(self):
+        """Logs the timings and query counts of each size"""
+        sizes = [int(size) for size in os.environ.get(
+            'PAYROLL_BENCHMARK_SIZES', '100').split(',')]
+        for size in sizes:
+            timings = self._run_payroll(self._generate_workforce(size))
+            _logger.info(
+                "Payroll benchmark for %s employees:\n%s", size, '\n'.join(
+                    "%-30s %10.3fs %10d queries" % timing
+                    for timing in timings))
@@ -0,0 +1,115 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from unittest.mock import patch
+
+from odoo.exceptions import UserError
+from odoo.tests import tagged
+from odoo.addons.hr_payroll_community.tests.common import PayrollTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPayrollJob(PayrollTestCommon):
+    """ The payslips generated by chunks in the payroll jobs are those of
+    the serial generation, a failed chunk being generated again when it is
+    retried."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestPayrollJob, cls).setUpClass()
+        cls.employees = cls._create_employees(5)
+
+    def _create_run(self, name):
+        """Payslip batch over the test period"""
+        return self.env['hr.payslip.run'].create({
+            'name': name,
+            'date_start': self.date_from,
+            'date_end': self.date_to,
+        })
+
+    def _get_jobs(self, run):
+        """Payroll jobs of a payslip batch"""
+        return self.env['hr.payroll.job'].search([
+            ('res_model', '=', run._name),
+            ('res_id', '=', run.id),
+        ])
+
+    def test_parallel_generation(self):
+        """The chunks run by the crons give the payslips of the serial
+        generation, a failed chunk being kept until it is retried"""
+        serial_run = self._create_run('Serial')
+        self.env['hr.payslip.employees'].with_context(
+            active_id=serial_run.id).create({
+                'employee_ids': [(6, 0, self.employees.ids)],
+            }).action_compute_sheet()
+        run = self._create_run('Parallel')
+        wizard = self.env['hr.payslip.employees'].with_context(
+            active_id=run.id).create({
+                'employee_ids': [(6, 0, self.employees.ids)],
+                'parallel_compute': True,
+                'chunk_size': 2,
+            })
+        wizard._generate_payslips_parallel(self.employees.ids, run.id)
+        jobs = self._get_jobs(run)
+        self.assertEqual(len(jobs), 3)
+        self.assertEqual(run.generation_state, 'running')
+        # the chunk of the last employee fails the first time
+        Wizard = type(self.env['hr.payslip.employees'])
+        generate_payslips = Wizard._generate_payslips
+        failing = self.employees[-1]
+
+        def generate_or_fail(wizard, employees, run_data, active_id):
+            if failing in employees:
+                raise UserError("Chunk failed")
+            return generate_payslips(wizard, employees, run_data, active_id)
+
+        with patch.object(Wizard, '_generate_payslips', generate_or_fail):
+            self.env['hr.payroll.job']._cron_run()
+        self.env.invalidate_all()
+        failed = jobs.filtered(lambda job: job.state == 'failed')
+        self.assertEqual(failed.employee_ids, failing)
+        self.assertEqual(failed.error, "Chunk failed")
+        self.assertEqual(run.generation_state, 'failed')
+        self.assertEqual(run.slip_ids.employee_id,
+                         self.employees - failing)
+        run.action_retry_generation()
+        self.assertEqual(failed.state, 'pending')
+        self.env['hr.payroll.job']._cron_run()
+        self.env.invalidate_all()
+        self.assertTrue(all(job.state == 'done' for job in jobs))
+        self.assertFalse(run.generation_state)
+        self.assertEqual(run.slip_ids.employee_id, self.employees)
+        self.assertEqual(self._get_lines(run.slip_ids),
+                         self._get_lines(serial_run.slip_ids))
+
+    def test_job_method_whitelist(self):
+        """A job calling a method out of the payroll methods is failed
+        without running it"""
+        run = self._create_run('Whitelist')
+        job = self.env['hr.payroll.job'].create({
+            'res_model': run._name,
+            'res_id': run.id,
+            'method': 'unlink',
+        })
+        self.env['hr.payroll.job']._cron_run()
+        self.assertEqual(job.state, 'failed')
+        self.assertTrue(run.exists())
@@ -0,0 +1,99 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+from unittest.mock import patch
+
+from odoo.tests import tagged
+from odoo.addons.hr_payroll_community.tests.common import PayrollTestCommon
+
+
+@tagged('post_install', '-at_install')
+class TestPayslipIncremental(PayrollTestCommon):
+    """ The incremental update of a payslip evaluates again only the rules
+    depending on what changed, and gives the lines of a full computation."""
+
+    def setUp(self):
+        super(TestPayslipIncremental, self).setUp()
+        self.employee = self._create_employees(1)
+        self.contract = self.employee.contract_ids
+        self.payslip = self.env['hr.payslip'].create({
+            'employee_id': self.employee.id,
+            'contract_id': self.contract.id,
+            'struct_id': self.structure.id,
+            'date_from': self.date_from,
+            'date_to': self.date_to,
+            'input_line_ids': [(0, 0, {
+                'name': 'Bonus',
+                'code': 'BONUS',
+                'contract_id': self.contract.id,
+                'amount': 100.0,
+            })],
+        })
+        self.payslip.action_compute_sheet()
+
+    def _compute_incremental(self):
+        """Updates the payslip incrementally, returning the codes of the
+        rules evaluated again"""
+        Rule = type(self.env['hr.salary.rule'])
+        satisfy_condition = Rule._satisfy_condition
+        evaluated = []
+
+        def record_evaluation(rule, localdict):
+            evaluated.append(rule.code)
+            return satisfy_condition(rule, localdict)
+
+        with patch.object(Rule, '_satisfy_condition', record_evaluation):
+            self.payslip.action_compute_sheet_incremental()
+        return set(evaluated)
+
+    def _assert_full_compute_lines(self):
+        """Checks the lines of the payslip against a full computation"""
+        lines = self._get_lines(self.payslip)
+        self.payslip.action_compute_sheet()
+        self.assertEqual(lines, self._get_lines(self.payslip))
+
+    def test_changed_input(self):
+        """Only the rules reading the changed input, or the rules and
+        categories depending on it, are evaluated again"""
+        self.payslip.input_line_ids.amount = 250.0
+        self.assertEqual(self._compute_incremental(),
+                         {'BONUS', 'GROSS', 'NET'})
+        self.assertEqual(self._get_lines(self.payslip)[
+            self.employee.id, 'NET'], self.contract.wage + 250.0)
+        self._assert_full_compute_lines()
+
+    def test_linked_record(self):
+        """A rule reading a record linked to the contract is not tracked by
+        the snapshot: its change computes the payslip again from scratch"""
+        rule = self._create_rules([
+            ('HOURS', 'ALW', 20,
+             'result = contract.resource_calendar_id.hours_per_day'),
+        ])
+        self.structure.rule_ids = [(4, rule.id)]
+        self.payslip.action_compute_sheet()
+        self.calendar.hours_per_day = 6.0
+        self.payslip.input_line_ids.amount = 250.0
+        self.assertEqual(self._compute_incremental(),
+                         {'BASIC', 'BONUS', 'HOURS', 'GROSS', 'NET'})
+        self.assertEqual(self._get_lines(self.payslip)[
+            self.employee.id, 'HOURS'], 6.0)
+        self._assert_full_compute_lines()
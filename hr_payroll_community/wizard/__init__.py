@@ -22,3 +22,4 @@
 #############################################################################
 from . import hr_payslips_employees
 from . import payslip_lines_contribution_register
+from . import hr_payroll_simulation
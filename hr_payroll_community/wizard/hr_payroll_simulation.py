@@ -0,0 +1,273 @@
+# -*- coding: utf-8 -*-
+#############################################################################
+#    A part of Open HRMS Project <https://www.openhrms.com>
+#
+#    Cybrosys Technologies Pvt. Ltd.
+#
+#    Copyright (C) 2024-TODAY Cybrosys Technologies(<https://www.cybrosys.com>)
+#    Author: Cybrosys Techno Solutions(<https://www.cybrosys.com>)
+#
+#    You can modify it under the terms of the GNU LESSER
+#    GENERAL PUBLIC LICENSE (LGPL v3), Version 3.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU LESSER GENERAL PUBLIC LICENSE (LGPL v3) for more details.
+#
+#    You should have received a copy of the GNU LESSER GENERAL PUBLIC LICENSE
+#    (LGPL v3) along with this program.
+#    If not, see <http://www.gnu.org/licenses/>.
+#
+#############################################################################
+import base64
+import csv
+import io
+import threading
+from datetime import date, datetime
+from dateutil.relativedelta import relativedelta
+
+from odoo import Command, api, fields, models, _
+from odoo.addons.hr_payroll_community.models.hr_payslip import \
+    PayslipHistory
+from odoo.exceptions import UserError
+
+# Columns of the simulation results, one value per payslip line
+SIMULATION_COLUMNS = ('employee_id', 'contract_id', 'salary_rule_id', 'code',
+                      'category_id', 'quantity', 'rate', 'amount', 'total')
+
+
+class HrPayrollSimulation(models.TransientModel):
+    """Create new model for simulating the payroll of employees without
+    creating payslips"""
+    _name = 'hr.payroll.simulation'
+    _description = 'Payroll Simulation'
+
+    employee_ids = fields.Many2many('hr.employee', string='Employees',
+                                    required=True,
+                                    help="Employees whose payroll is "
+                                         "simulated")
+    date_from = fields.Date(string='Date From', required=True,
+                            help="Start date of the simulated payslips",
+                            default=lambda self: fields.Date.to_string(
+                                date.today().replace(day=1)))
+    date_to = fields.Date(string='Date To', required=True,
+                          help="End date of the simulated payslips",
+                          default=lambda self: fields.Date.to_string(
+                              (datetime.now() + relativedelta(months=+1, day=1,
+                                                              days=-1)).date()))
+    wage_raise = fields.Float(string='Wage Raise (%)',
+                              help="Raise applied to the wage of the "
+                                   "contracts for the simulation")
+    struct_id = fields.Many2one('hr.payroll.structure',
+                                string='Structure',
+                                help="Structure applied instead of the "
+                                     "structures of the contracts, to try a "
+                                     "new version of the rules")
+    parallel_compute = fields.Boolean(string='Parallel Computation',
+                                      help="Simulate the employees by chunks "
+                                           "computed in the background by "
+                                           "the payroll crons.")
+    chunk_size = fields.Integer(string='Chunk Size', default=100,
+                                help="Number of employees simulated by a "
+                                     "worker at once.")
+    worker_count = fields.Integer(string='Workers', default=4,
+                                  help="Number of payroll crons woken up to "
+                                       "simulate the chunks, at most 4.")
+    state = fields.Selection([
+        ('draft', 'Draft'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string='Status', default='draft', readonly=True,
+        help="Status of the simulation")
+    error = fields.Text(string='Error', readonly=True,
+                        help="Error of the chunks which failed")
+    line_count = fields.Integer(string='Simulated Lines', readonly=True,
+                                help="Number of payslip lines simulated")
+    csv_file = fields.Binary(string='Result', readonly=True,
+                             attachment=False,
+                             help="Simulated payslip lines, one row per "
+                                  "line")
+    csv_filename = fields.Char(string='File Name', readonly=True,
+                               help="Name of the result file")
+
+    def action_simulate(self):
+        """Function for simulating the payroll and exporting the result"""
+        self.ensure_one()
+        if not self.employee_ids:
+            raise UserError(
+                _("You must select employee(s) to simulate the payroll."))
+        if self.parallel_compute and not getattr(
+                threading.current_thread(), 'testing', False):
+            self._simulate_parallel(self.employee_ids.ids)
+        else:
+            self._write_result(self._simulate(self.employee_ids.ids))
+        return self._get_form_action()
+
+    def action_refresh(self):
+        """Function for collecting the results of the chunks simulated in
+        the background once they are all done"""
+        self.ensure_one()
+        jobs = self.env['hr.payroll.job'].search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+        ])
+        failed = jobs.filtered(lambda job: job.state == 'failed')
+        if failed:
+            self.write({
+                'state': 'failed',
+                'error': '\n'.join(failed.mapped('error')),
+            })
+        elif jobs and all(job.state == 'done' for job in jobs):
+            result = {column: [] for column in SIMULATION_COLUMNS}
+            for job in jobs:
+                for column in SIMULATION_COLUMNS:
+                    result[column] += job.result[column]
+            self._write_result(result)
+            jobs.sudo().unlink()
+        return self._get_form_action()
+
+    @api.autovacuum
+    def _transient_vacuum(self):
+        """Function for keeping the simulations whose chunks are not
+        simulated yet, the jobs needing them until they run"""
+        self.env.cr.execute("""
+            UPDATE hr_payroll_simulation
+               SET write_date = now() AT TIME ZONE 'UTC'
+             WHERE id IN (SELECT res_id FROM hr_payroll_job
+                           WHERE res_model = %s AND state = 'pending')
+        """, [self._name])
+        return super(HrPayrollSimulation, self)._transient_vacuum()
+
+    def _write_result(self, result):
+        """Function for storing the CSV file of a simulation result"""
+        self.write({
+            'state': 'done',
+            'error': False,
+            'line_count': len(result['code']),
+            'csv_file': base64.b64encode(self._export_csv(result)),
+            'csv_filename': 'payroll_simulation_%s_%s.csv' % (
+                self.date_from, self.date_to),
+        })
+
+    def _get_form_action(self):
+        """Function for reopening the simulation form"""
+        return {
+            'type': 'ir.actions.act_window',
+            'res_model': self._name,
+            'res_id': self.id,
+            'view_mode': 'form',
+            'target': 'new',
+        }
+
+    def _simulate(self, employee_ids):
+        """
+        Run the rule engine for employees on payslips kept in memory: the
+        payslips, their lines and the raised contracts are new records,
+        never written to the database.
+        @param employee_ids: ids of the employees to simulate
+        @return: dict mapping each of SIMULATION_COLUMNS to the list of its
+        values, one per simulated payslip line
+        """
+        self.ensure_one()
+        result = {column: [] for column in SIMULATION_COLUMNS}
+        Payslip = self.env['hr.payslip']
+        date_from, date_to = self.date_from, self.date_to
+        contract_ids = Payslip._get_contracts_batch(employee_ids, date_from,
+                                                    date_to)
+        contracts = self.env['hr.contract'].browse(
+            [contract_id for ids in contract_ids.values()
+             for contract_id in ids])
+        worked_days = {contract_id: [] for contract_id in contracts.ids}
+        for line in Payslip.get_worked_day_lines(contracts, date_from,
+                                                 date_to):
+            worked_days[line['contract_id']].append(line)
+        Payslip = Payslip.with_context(payslip_input_values={
+            'employee_ids': set(employee_ids),
+            'date_from': date_from,
+            'date_to': date_to,
+            'values': Payslip._get_batch_input_values(
+                employee_ids, date_from, date_to),
+        })
+        history = PayslipHistory(
+            self.env, employee_ids,
+            date_from + relativedelta(years=-1, month=1, day=1))
+        factor = 1.0 + self.wage_raise / 100.0
+        structure_ids = self.struct_id and tuple(sorted(
+            set(self.struct_id._get_parent_structure().ids)))
+        for employee in self.env['hr.employee'].browse(employee_ids):
+            employee_contracts = self.env['hr.contract'].browse(
+                contract_ids[employee.id])
+            if not employee_contracts:
+                continue
+            if self.wage_raise:
+                employee_contracts = employee_contracts.browse(
+                    [contract.new({'wage': contract.wage * factor},
+                                  origin=contract).id
+                     for contract in employee_contracts])
+            payslip = Payslip.new({
+                'employee_id': employee.id,
+                'date_from': date_from,
+                'date_to': date_to,
+                'contract_id': employee_contracts[:1].id,
+                'struct_id': self.struct_id.id or
+                employee_contracts[:1].struct_id.id,
+                'worked_days_line_ids': [
+                    Command.create(dict(line, contract_id=contract.id))
+                    for contract in employee_contracts
+                    for line in worked_days[contract._origin.id]],
+                'input_line_ids': [
+                    Command.create(dict(line, contract_id=contract.id))
+                    for contract in employee_contracts
+                    for line in Payslip.get_inputs(
+                        contract._origin, date_from, date_to,
+                        structure_ids=structure_ids or None)],
+            })
+            for line in Payslip._get_payslip_lines(
+                    employee_contracts.ids, payslip.id,
+                    structure_ids=structure_ids or tuple(sorted(
+                        employee_contracts._origin.get_all_structures())),
+                    history=history):
+                line['contract_id'] = employee_contracts.browse(
+                    line['contract_id'])._origin.id
+                line['total'] = line['amount'] * line['quantity'] * line[
+                    'rate'] / 100.0
+                for column in SIMULATION_COLUMNS:
+                    result[column].append(line[column])
+        return result
+
+    def _run_simulation_job(self, job):
+        """Function run by a payroll job: simulates the employees of the job
+        and returns the result kept on the job"""
+        return self._simulate(job.employee_ids.ids)
+
+    def _simulate_parallel(self, employee_ids):
+        """Function for queuing the simulation of the employees by chunks,
+        run in the background by the payroll crons in their own workers.
+        The results are collected by action_refresh"""
+        chunk_size = max(self.chunk_size, 1)
+        self.env['hr.payroll.job'].sudo().create([{
+            'res_model': self._name,
+            'res_id': self.id,
+            'method': '_run_simulation_job',
+            'employee_ids': [Command.set(employee_ids[i:i + chunk_size])],
+        } for i in range(0, len(employee_ids), chunk_size)])
+        self.write({'state': 'running', 'error': False, 'csv_file': False})
+        self.env['hr.payroll.job']._trigger_workers(self.worker_count)
+
+    def _export_csv(self, result):
+        """
+        @param result: simulation result, as returned by _simulate
+        @return: the CSV file of the result, one row per payslip line, with
+        the names of the employees and rules next to their ids
+        """
+        employees = self.env['hr.employee'].browse(
+            set(result['employee_id']))
+        names = {employee.id: employee.name for employee in employees}
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(('employee',) + SIMULATION_COLUMNS)
+        for row in zip(*(result[column] for column in SIMULATION_COLUMNS)):
+            writer.writerow((names[row[0]],) + row)
+        return buffer.getvalue().encode('utf-8')
@@ -20,7 +20,9 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import fields, models, _
+import threading
+
+from odoo import Command, fields, models, _
 from odoo.exceptions import UserError
 
 
@@ -34,40 +36,112 @@ class HrPayslipEmployees(models.TransientModel):
                                     'payslip_id',
                                     'employee_id', 'Employees',
                                     help="Choose employee for Payslip")
+    parallel_compute = fields.Boolean(string='Parallel Generation',
+                                      help="Split the employees into chunks "
+                                           "generated in the background by "
+                                           "the payroll crons, each chunk "
+                                           "being committed in its own "
+                                           "transaction.")
+    chunk_size = fields.Integer(string='Chunk Size', default=100,
+                                help="Number of employees generated by a "
+                                     "worker in one transaction.")
+    worker_count = fields.Integer(string='Workers', default=4,
+                                  help="Number of payroll crons woken up to "
+                                       "generate the chunks, at most 4.")
 
     def action_compute_sheet(self):
         """Function for compute Payslip Sheet"""
-        payslips = self.env['hr.payslip']
         [data] = self.read()
         active_id = self.env.context.get('active_id')
         if active_id:
             [run_data] = self.env['hr.payslip.run'].browse(active_id).read(
                 ['date_start', 'date_end', 'credit_note'])
-        from_date = run_data.get('date_start')
-        to_date = run_data.get('date_end')
         if not data['employee_ids']:
             raise UserError(
                 _("You must select employee(s) to generate payslip(s)."))
-        for employee in self.env['hr.employee'].browse(data['employee_ids']):
-            slip_data = (
-                self.env['hr.payslip'].onchange_employee_id(
-                    from_date, to_date, employee.id, contract_id=False))
-            res = {
-                'employee_id': employee.id,
-                'name': slip_data['value'].get('name'),
-                'struct_id': slip_data['value'].get('struct_id'),
-                'contract_id': slip_data['value'].get('contract_id'),
-                'payslip_run_id': active_id,
-                'input_line_ids': [(0, 0, x) for x in
-                                   slip_data['value'].get('input_line_ids')],
-                'worked_days_line_ids': [(0, 0, x) for x in
-                                         slip_data['value'].get(
-                                             'worked_days_line_ids')],
-                'date_from': from_date,
-                'date_to': to_date,
-                'credit_note': run_data.get('credit_note'),
-                'company_id': employee.company_id.id,
-            }
-            payslips += self.env['hr.payslip'].create(res)
-        payslips.action_compute_sheet()
+        if self.parallel_compute and active_id and not getattr(
+                threading.current_thread(), 'testing', False):
+            self._generate_payslips_parallel(data['employee_ids'], active_id)
+        else:
+            self._generate_payslips(
+                self.env['hr.employee'].browse(data['employee_ids']),
+                run_data, active_id)
         return {'type': 'ir.actions.act_window_close'}
+
+    def _prepare_payslip_vals(self, employee, run_data, active_id):
+        """Function for getting the values of the payslip of an employee"""
+        from_date = run_data.get('date_start')
+        to_date = run_data.get('date_end')
+        slip_data = (
+            self.env['hr.payslip'].onchange_employee_id(
+                from_date, to_date, employee.id, contract_id=False))
+        return {
+            'employee_id': employee.id,
+            'name': slip_data['value'].get('name'),
+            'struct_id': slip_data['value'].get('struct_id'),
+            'contract_id': slip_data['value'].get('contract_id'),
+            'payslip_run_id': active_id,
+            'input_line_ids': [(0, 0, x) for x in
+                               slip_data['value'].get('input_line_ids')],
+            'worked_days_line_ids': [(0, 0, x) for x in
+                                     slip_data['value'].get(
+                                         'worked_days_line_ids')],
+            'date_from': from_date,
+            'date_to': to_date,
+            'credit_note': run_data.get('credit_note'),
+            'company_id': employee.company_id.id,
+        }
+
+    def _generate_payslips(self, employees, run_data, active_id):
+        """Function for creating and computing the payslips of employees"""
+        date_from = run_data.get('date_start')
+        date_to = run_data.get('date_end')
+        Payslip = self.env['hr.payslip']
+        # resolve the contracts, worked days and inputs of all the employees
+        # at once
+        contract_ids = Payslip._get_contracts_batch(employees.ids, date_from,
+                                                    date_to)
+        contracts = self.env['hr.contract'].browse(
+            [contract_id for ids in contract_ids.values()
+             for contract_id in ids])
+        worked_days = {contract_id: [] for contract_id in contracts.ids}
+        for line in Payslip.get_worked_day_lines(contracts, date_from,
+                                                 date_to):
+            worked_days[line['contract_id']].append(line)
+        wizard = self.with_context(payslip_contract_ids={
+            'date_from': date_from,
+            'date_to': date_to,
+            'values': contract_ids,
+        }, payslip_worked_days={
+            'date_from': date_from,
+            'date_to': date_to,
+            'values': worked_days,
+        }, payslip_input_values={
+            'employee_ids': set(employees.ids),
+            'date_from': date_from,
+            'date_to': date_to,
+            'values': Payslip._get_batch_input_values(
+                employees.ids, date_from, date_to),
+        })
+        payslips = self.env['hr.payslip']
+        for employee in employees:
+            payslips += self.env['hr.payslip'].create(
+                wizard._prepare_payslip_vals(employee, run_data, active_id))
+        payslips.action_compute_sheet()
+        return payslips
+
+    def _generate_payslips_parallel(self, employee_ids, active_id):
+        """Function for queuing the generation of the payslips by chunks of
+        employees, run in the background by the payroll crons in their own
+        workers. The progress and the failed chunks are shown on the payslip
+        batch"""
+        run = self.env['hr.payslip.run'].browse(active_id)
+        chunk_size = max(self.chunk_size, 1)
+        self.env['hr.payroll.job'].sudo().create([{
+            'res_model': run._name,
+            'res_id': run.id,
+            'method': '_run_generation_job',
+            'employee_ids': [Command.set(employee_ids[i:i + chunk_size])],
+        } for i in range(0, len(employee_ids), chunk_size)])
+        run.generation_total = len(run.slip_ids) + len(employee_ids)
+        self.env['hr.payroll.job']._trigger_workers(self.worker_count)
@@ -33,7 +33,11 @@ class HrEmployee(models.Model):
         compute='_compute_loan_count')
 
     def _compute_loan_count(self):
-        """Compute the number of loans associated with the employee."""
+        """Compute the number of loans associated with the employees, with a
+        single grouped query for all of them."""
+        result = {employee.id: count for employee, count in
+                  self.env['hr.loan']._read_group(
+                      [('employee_id', 'in', self.ids)], ['employee_id'],
+                      ['__count'])}
         for rec in self:
-            rec.loan_count = rec.env['hr.loan'].search_count(
-                [('employee_id', '=', rec.id)])
+            rec.loan_count = result.get(rec._origin.id, 0)
@@ -20,7 +20,6 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from datetime import datetime
 from dateutil.relativedelta import relativedelta
 from odoo import api, fields, models, _
 from odoo.exceptions import ValidationError, UserError
@@ -60,6 +59,19 @@ class HrLoan(models.Model):
                                          "employee belongs.")
     installment = fields.Integer(string="No Of Installments", default=1,
                                  help="Number of installments")
+    schedule_type = fields.Selection(
+        [('equal', 'Equal Installments'),
+         ('declining', 'Declining Balance'),
+         ('annuity', 'Fixed Payment with Interest')],
+        string="Repayment Schedule", default='equal', required=True,
+        help="Equal installments repay the loan amount without interest. "
+             "Declining balance repays an equal part of the loan amount "
+             "plus the interest on the remaining balance. Fixed payment "
+             "repays the loan with interest by equal installments.")
+    interest_rate = fields.Float(string="Interest Rate (%)",
+                                 help="Yearly interest rate of the loan, "
+                                      "charged monthly on the remaining "
+                                      "balance")
     payment_date = fields.Date(string="Payment Start Date", required=True,
                                default=fields.Date.today(),
                                help="Date of the payment")
@@ -83,7 +95,8 @@ class HrLoan(models.Model):
                                help="Loan amount")
     total_amount = fields.Float(string="Total Amount", store=True,
                                 readonly=True, compute='_compute_total_amount',
-                                help="The total amount of the loan")
+                                help="The total amount of the loan, "
+                                     "interest included")
     balance_amount = fields.Float(string="Balance Amount", store=True,
                                   compute='_compute_total_amount',
                                   help="""The remaining balance amount of the 
@@ -99,16 +112,30 @@ class HrLoan(models.Model):
          ], string="State", default='draft', help="The current state of the "
                                                   "loan request.", copy=False)
 
+    @api.depends('loan_amount', 'loan_lines.amount', 'loan_lines.paid')
     def _compute_total_amount(self):
-        """ Compute total loan amount,balance amount and total paid amount"""
-        total_paid = 0.0
+        """ Compute total loan amount,balance amount and total paid amount.
+            The installments of the saved loans are summed by the database
+            instead of being read one by one"""
+        totals = {}
+        loans = self.filtered('id')
+        if loans:
+            for loan, paid, amount in self.env['hr.loan.line']._read_group(
+                    [('loan_id', 'in', loans.ids)], ['loan_id', 'paid'],
+                    ['amount:sum']):
+                totals.setdefault(loan.id, {})[paid] = amount
         for loan in self:
-            for line in loan.loan_lines:
-                if line.paid:
-                    total_paid += line.amount
-            balance_amount = loan.loan_amount - total_paid
-            loan.total_amount = loan.loan_amount
-            loan.balance_amount = balance_amount
+            if loan.id:
+                loan_totals = totals.get(loan.id, {})
+            else:
+                loan_totals = {}
+                for line in loan.loan_lines:
+                    loan_totals[line.paid] = loan_totals.get(
+                        line.paid, 0.0) + line.amount
+            total_paid = loan_totals.get(True, 0.0)
+            loan.total_amount = loan_totals and sum(
+                loan_totals.values()) or loan.loan_amount
+            loan.balance_amount = loan.total_amount - total_paid
             loan.total_paid_amount = total_paid
 
     @api.model
@@ -130,21 +157,49 @@ class HrLoan(models.Model):
     def action_compute_installment(self):
         """This automatically create the installment the employee need to pay to
             company based on payment start date and the no of installments.
+            The installments of all the loans are created at once.
             """
-        for loan in self:
-            loan.loan_lines.unlink()
-            date_start = datetime.strptime(str(loan.payment_date), '%Y-%m-%d')
-            amount = loan.loan_amount / loan.installment
-            for i in range(1, loan.installment + 1):
-                self.env['hr.loan.line'].create({
-                    'date': date_start,
-                    'amount': amount,
-                    'employee_id': loan.employee_id.id,
-                    'loan_id': loan.id})
-                date_start = date_start + relativedelta(months=1)
-            loan._compute_total_amount()
+        self.mapped('loan_lines').unlink()
+        self.env['hr.loan.line'].create([
+            dict(values, employee_id=loan.employee_id.id, loan_id=loan.id)
+            for loan in self for values in loan._get_installment_schedule()])
         return True
 
+    def _get_installment_schedule(self):
+        """ Compute the amortization table of the loan in one pass
+            :return: List of the values of the installments, the last one
+            absorbing the rounding of the others"""
+        self.ensure_one()
+        if self.installment <= 0:
+            raise ValidationError(
+                _("The number of installments must be positive"))
+        count = self.installment
+        rate = self.interest_rate / 100.0 / 12.0
+        if self.schedule_type == 'annuity' and rate:
+            payment = self.loan_amount * rate / (1 - (1 + rate) ** -count)
+        else:
+            payment = self.loan_amount / count
+        currency_round = self.currency_id.round
+        balance = self.loan_amount
+        schedule = []
+        for i in range(count):
+            interest = 0.0
+            if self.schedule_type != 'equal':
+                interest = currency_round(balance * rate)
+            if i == count - 1:
+                principal = balance
+            elif self.schedule_type == 'annuity':
+                principal = currency_round(payment) - interest
+            else:
+                principal = currency_round(payment)
+            balance -= principal
+            schedule.append({
+                'date': self.payment_date + relativedelta(months=i),
+                'amount': currency_round(principal + interest),
+                'interest_amount': interest,
+            })
+        return schedule
+
     def action_refuse(self):
         """ Function to reject loan request"""
         return self.write({'state': 'refuse'})
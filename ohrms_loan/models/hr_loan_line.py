@@ -33,6 +33,9 @@ class HrLoanLine(models.Model):
     employee_id = fields.Many2one('hr.employee', string="Employee",
                                   help="Employee")
     amount = fields.Float(string="Amount", required=True, help="Amount")
+    interest_amount = fields.Float(string="Interest",
+                                   help="Part of the amount paying the "
+                                        "interest of the loan")
     paid = fields.Boolean(string="Paid", help="Indicates whether the "
                                               "installment has been paid.")
     loan_id = fields.Many2one('hr.loan', string="Loan Ref.",
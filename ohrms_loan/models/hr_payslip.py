@@ -20,7 +20,7 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import models
+from odoo import api, models
 
 
 class HrPayslip(models.Model):
@@ -28,36 +28,32 @@ class HrPayslip(models.Model):
     additional functionality related to employee loans."""
     _inherit = 'hr.payslip'
 
-    def get_inputs(self, contract_ids, date_from, date_to):
-        """Compute additional inputs for the employee payslip,
-        considering active loans.
-        :param contract_ids: Contract ID of the current employee.
-        :param date_from: Start date of the payslip.
-        :param date_to: End date of the payslip.
-        :return: List of dictionaries representing additional inputs for
-        the payslip."""
-        res = super(HrPayslip, self).get_inputs(contract_ids, date_from,
-                                                date_to)
-        employee_id = self.env['hr.contract'].browse(
-            contract_ids[0].id).employee_id if contract_ids \
-            else self.employee_id
-        loan_id = self.env['hr.loan'].search(
-            [('employee_id', '=', employee_id.id), ('state', '=', 'approve')])
-        for loan in loan_id:
-            for loan_line in loan.loan_lines:
-                if (date_from <= loan_line.date <= date_to and
-                        not loan_line.paid):
-                    for result in res:
-                        if result.get('code') == 'LO':
-                            result['amount'] = loan_line.amount
-                            result['loan_line_id'] = loan_line.id
+    @api.model
+    def _get_batch_input_values(self, employee_ids, date_from, date_to):
+        """Feed the 'LO' input of the payslips with the unpaid installment
+        of the approved loans of the employees due in the period.
+        :param employee_ids: IDs of the employees of the batch.
+        :param date_from: Start date of the payslips.
+        :param date_to: End date of the payslips.
+        :return: Dictionary of the input values by employee and code."""
+        res = super(HrPayslip, self)._get_batch_input_values(
+            employee_ids, date_from, date_to)
+        loan_lines = self.env['hr.loan.line'].search_fetch(
+            [('loan_id.employee_id', 'in', employee_ids),
+             ('loan_id.state', '=', 'approve'),
+             ('date', '>=', date_from), ('date', '<=', date_to),
+             ('paid', '=', False)],
+            ['amount', 'loan_id'], order='loan_id, id')
+        for loan_line in loan_lines:
+            res.setdefault(loan_line.loan_id.employee_id.id, {})['LO'] = {
+                'amount': loan_line.amount,
+                'loan_line_id': loan_line.id,
+            }
         return res
 
     def action_payslip_done(self):
         """ Compute the loan amount and remaining amount while confirming
             the payslip"""
-        for line in self.input_line_ids:
-            if line.loan_line_id:
-                line.loan_line_id.paid = True
-                line.loan_line_id.loan_id._compute_total_amount()
+        # the totals of the loans are recomputed once for all the lines
+        self.mapped('input_line_ids.loan_line_id').write({'paid': True})
         return super(HrPayslip, self).action_payslip_done()
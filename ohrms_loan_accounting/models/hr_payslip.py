@@ -31,14 +31,14 @@ class HrPayslipAcc(models.Model):
 
     def action_payslip_done(self):
         """ Calculate the dates and make the status as done"""
-        for line in self.input_line_ids:
-            date_from = self.date_from
-            tym = datetime.combine(fields.Date.from_string(date_from),
+        for slip in self:
+            tym = datetime.combine(fields.Date.from_string(slip.date_from),
                                    time.min)
             locale = self.env.context.get('lang') or 'en_US'
             month = tools.ustr(
                 babel.dates.format_date(date=tym, format='MMMM-y',
                                         locale=locale))
-            if line.loan_line_id:
-                line.loan_line_id.action_paid_amount(month)
+            for line in slip.input_line_ids:
+                if line.loan_line_id:
+                    line.loan_line_id.action_paid_amount(month)
         return super(HrPayslipAcc, self).action_payslip_done()
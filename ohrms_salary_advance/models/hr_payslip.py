@@ -20,33 +20,30 @@
 #    If not, see <http://www.gnu.org/licenses/>.
 #
 #############################################################################
-from odoo import models
+from dateutil.relativedelta import relativedelta
+from odoo import api, fields, models
 
 
 class HrPayslip(models.Model):
-    """Class for the inherited model hr_payslip. Supering get_inputs() method
-        inorder to add details of advance salary in the payslip."""
+    """Class for the inherited model hr_payslip. Extending the batched
+        input resolution inorder to add details of advance salary in the
+        payslip."""
     _inherit = 'hr.payslip'
 
-    def get_inputs(self, contract_ids, date_from, date_to):
-        """Supering get_inputs() method inorder to add details of advance
-           salary in the payslip."""
-        res = super(HrPayslip, self).get_inputs(contract_ids, date_from,
-                                                date_to)
-        employee_id = self.env['hr.contract'].browse(
-            contract_ids[0].id).employee_id if contract_ids \
-            else self.employee_id
-        advance_salary = self.env['salary.advance'].search(
-            [('employee_id', '=', employee_id.id)])
-        for record in advance_salary:
-            current_date = date_from.month
-            date = record.date
-            existing_date = date.month
-            if current_date == existing_date:
-                state = record.state
-                amount = record.advance
-                for result in res:
-                    if state == 'approve' and amount != 0 and result.get(
-                            'code') == 'SAR':
-                        result['amount'] = amount
+    @api.model
+    def _get_batch_input_values(self, employee_ids, date_from, date_to):
+        """Feed the 'SAR' input of the payslips with the approved advance
+           salary of the employees in the month of the payslips."""
+        res = super(HrPayslip, self)._get_batch_input_values(
+            employee_ids, date_from, date_to)
+        month_start = fields.Date.to_date(date_from) + relativedelta(day=1)
+        advances = self.env['salary.advance'].search_fetch(
+            [('employee_id', 'in', employee_ids), ('state', '=', 'approve'),
+             ('advance', '!=', 0), ('date', '>=', month_start),
+             ('date', '<', month_start + relativedelta(months=1))],
+            ['employee_id', 'advance'], order='id')
+        for record in advances:
+            res.setdefault(record.employee_id.id, {})['SAR'] = {
+                'amount': record.advance,
+            }
         return res
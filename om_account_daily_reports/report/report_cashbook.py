@@ -56,9 +56,9 @@ class ReportCashBook(models.AbstractModel):
             for row in cr.dictfetchall():
                 move_lines[row.pop('account_id')].append(row)
 
-        sql_sort = 'l.date, l.move_id'
+        sql_sort = 'l.date, l.move_id, l.id'
         if sortby == 'sort_journal_partner':
-            sql_sort = 'j.code, p.name, l.move_id'
+            sql_sort = 'j.code, p.name, l.move_id, l.id'
 
         # Prepare sql query base on selected parameters from wizard
         tables, where_clause, where_params = MoveLine._query_get()
@@ -78,7 +78,8 @@ class ReportCashBook(models.AbstractModel):
                     if acc_in.payment_account_id:
                         accounts += acc_in.payment_account_id
 
-        sql = ('''SELECT l.id AS lid, l.account_id AS account_id, l.date AS ldate, j.code AS lcode, l.currency_id, l.amount_currency, l.ref AS lref, l.name AS lname, COALESCE(l.debit,0) AS debit, COALESCE(l.credit,0) AS credit, COALESCE(SUM(l.debit),0) - COALESCE(SUM(l.credit), 0) AS balance,\
+        sql = ('''SELECT l.id AS lid, l.account_id AS account_id, l.date AS ldate, j.code AS lcode, l.currency_id, l.amount_currency, l.ref AS lref, l.name AS lname, COALESCE(l.debit,0) AS debit, COALESCE(l.credit,0) AS credit, SUM(COALESCE(l.debit,0) - COALESCE(l.credit,0)) OVER (PARTITION BY l.account_id ORDER BY ''' + sql_sort + ''' ROWS UNBOUNDED PRECEDING) AS balance,\
+                        SUM(COALESCE(l.debit,0)) OVER (PARTITION BY l.account_id) AS account_debit, SUM(COALESCE(l.credit,0)) OVER (PARTITION BY l.account_id) AS account_credit,\
                         m.name AS move_name, c.symbol AS currency_code, p.name AS partner_name\
                         FROM account_move_line l\
                         JOIN account_move m ON (l.move_id=m.id)\
@@ -86,16 +87,19 @@ class ReportCashBook(models.AbstractModel):
                         LEFT JOIN res_partner p ON (l.partner_id=p.id)\
                         JOIN account_journal j ON (l.journal_id=j.id)\
                         JOIN account_account acc ON (l.account_id = acc.id) \
-                        WHERE l.account_id IN %s ''' + filters + ''' GROUP BY l.id, l.account_id, l.date, j.code, l.currency_id, l.amount_currency, l.ref, l.name, m.name, c.symbol, p.name ORDER BY ''' + sql_sort)
+                        WHERE l.account_id IN %s ''' + filters + ''' ORDER BY ''' + sql_sort)
         params = (tuple(accounts.ids),) + tuple(where_params)
         cr.execute(sql, params)
 
+        # Shift the running balances by the initial balance of their account
+        initial_lines = {account_id: lines[0] for account_id, lines in move_lines.items() if lines}
+        totals = {}
         for row in cr.dictfetchall():
-            balance = 0
-            for line in move_lines.get(row['account_id']):
-                balance += line['debit'] - line['credit']
-            row['balance'] += balance
-            move_lines[row.pop('account_id')].append(row)
+            account_id = row.pop('account_id')
+            if account_id in initial_lines:
+                row['balance'] += initial_lines[account_id]['balance']
+            totals[account_id] = (row.pop('account_debit'), row.pop('account_credit'))
+            move_lines[account_id].append(row)
 
         # Calculate the debit, credit and balance for Accounts
         account_res = []
@@ -105,10 +109,13 @@ class ReportCashBook(models.AbstractModel):
             res['code'] = account.code
             res['name'] = account.name
             res['move_lines'] = move_lines[account.id]
-            for line in res.get('move_lines'):
-                res['debit'] += line['debit']
-                res['credit'] += line['credit']
-                res['balance'] = line['balance']
+            if account.id in initial_lines:
+                res['debit'] += initial_lines[account.id]['debit']
+                res['credit'] += initial_lines[account.id]['credit']
+            if account.id in totals:
+                res['debit'] += totals[account.id][0]
+                res['credit'] += totals[account.id][1]
+            res['balance'] = res['debit'] - res['credit']
             if display_account == 'all':
                 account_res.append(res)
             if display_account == 'movement' and res.get('move_lines'):